@@ -1,12 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# Sem as regras RSLP o modo radical do executável falharia só na máquina do usuário.
+if not os.path.isdir(os.path.join('dados', 'nltk_data', 'stemmers', 'rslp')):
+    raise SystemExit(
+        "Regras RSLP ausentes em dados/nltk_data; rode antes "
+        "'python -m nltk.downloader -d dados/nltk_data rslp' (veja dados/nltk_data/LEIA-ME.txt)."
+    )
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
-    hiddenimports=[],
+    datas=[('dados/nltk_data', 'dados/nltk_data')],
+    # pyarrow só é importado ao gravar .parquet.
+    hiddenimports=['pyarrow', 'pyarrow.parquet'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,294 @@
+"""Benchmark da busca com planilhas sintéticas em português (roda offline, sem arquivos externos).
+
+Mede, para cada tamanho de planilha: leitura (sem e com cache em disco), preparo do texto
+normalizado/radicais, os quatro modos de busca com várias quantidades de palavras e a exportação.
+O relatório sai em JSON, com tempo, vazão e pico de memória de cada fase, para comparar versões.
+
+Exemplo:
+    python benchmark.py --linhas 10000,50000,200000 --palavras 1,5,20 -o bench_output.txt
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from cache_persistente import CachePersistente
+from motor_busca import (MODOS_BUSCA, EscritorRegistros, MotorBusca, PlanilhaExcel, ResultadoBusca,
+                         carregar_rslp, colunas_registros, registros_em_blocos)
+
+VOCABULARIO = [
+    "ação", "judicial", "decisão", "sentença", "petição", "recurso", "arquivamento", "desarquivamento",
+    "audiência", "tribunal", "juiz", "réu", "autor", "processo", "prazo", "citação", "intimação",
+    "execução", "penhora", "homologação", "conciliação", "perícia", "contestação", "apelação",
+    "agravo", "embargos", "certidão", "notificação", "procuração", "advogado", "ministério",
+    "público", "defensoria", "cartório", "distribuição", "competência", "jurisdição", "liminar",
+    "tutela", "urgência", "indenização", "danos", "morais", "materiais", "contrato", "rescisão",
+    "cobrança", "pagamento", "honorários", "custas", "trânsito", "julgado", "acórdão", "relator",
+    "votação", "sessão", "pauta", "publicação", "diário", "oficial", "eletrônico", "físico",
+    "documentação", "análise", "manifestação", "impugnação", "cálculo", "atualização", "correção",
+    "monetária", "juros", "mora", "parcelamento", "acordo", "extinção", "suspensão", "remessa",
+]
+
+# Frases curtas repetidas em muitas linhas, como as categorias e situações das planilhas reais.
+FRASES_COMUNS = [
+    "aguardando decisão", "processo arquivado", "em análise", "petição protocolada",
+    "audiência designada", "recurso pendente", "sentença publicada", "citação realizada",
+]
+
+
+# ===================== Planilhas sintéticas =====================
+def gerar_planilha(caminho: str, linhas: int, colunas: int, tamanho_texto: int, repeticao: float = 0.3,
+                   semente: int = 0) -> str:
+    """Grava uma aba "Dados" com ``colunas`` colunas de texto, uma numérica e uma de datas.
+
+    As palavras seguem uma distribuição de Zipf sobre o vocabulário; ``repeticao`` é a fração de
+    células de texto com uma frase comum (valores repetidos, que o cache de distintos aproveita).
+    """
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(semente)
+    pesos = 1 / np.arange(1, len(VOCABULARIO) + 1)
+    pesos /= pesos.sum()
+    palavras_por_celula = max(1, tamanho_texto // 9)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Dados")
+    ws.append([f"Texto{j + 1}" for j in range(colunas)] + ["Numero", "Data"])
+    inicio = datetime(2020, 1, 1)
+    for i in range(linhas):
+        sorteio = rng.choice(len(VOCABULARIO), size=(colunas, palavras_por_celula), p=pesos)
+        comuns = rng.random(colunas) < repeticao
+        textos = [FRASES_COMUNS[sorteio[j, 0] % len(FRASES_COMUNS)] if comuns[j]
+                  else " ".join(VOCABULARIO[k] for k in sorteio[j]) for j in range(colunas)]
+        ws.append(textos + [int(rng.integers(1, 1_000_000)), inicio + timedelta(hours=i)])
+    wb.save(caminho)
+    return caminho
+
+
+def _planilha_sintetica(diretorio: str, linhas: int, args) -> str:
+    # Reaproveita a planilha já gerada com os mesmos parâmetros.
+    nome = f"sintetica_{linhas}x{args.colunas}_t{args.tamanho_texto}_r{args.repeticao:g}_s{args.semente}.xlsx"
+    caminho = os.path.join(diretorio, nome)
+    if not os.path.exists(caminho):
+        logging.info("Gerando %s", caminho)
+        gerar_planilha(caminho, linhas, args.colunas, args.tamanho_texto, args.repeticao, args.semente)
+    return caminho
+
+
+def palavras_busca(quantidade: int) -> list[str]:
+    """As ``quantidade`` palavras buscadas: termos do vocabulário, alguns sem acento ou compostos."""
+    base = ["arquivamento", "decisao", "acao judicial", "peticao", "sentença", "recurso", "audiencia",
+            "tribunal", "citação", "execucao"]
+    extras = [p for p in VOCABULARIO if p not in base]
+    return (base + extras)[:quantidade]
+
+
+# ===================== Medição =====================
+def _medir(funcao, preparo=None, memoria: bool = True, repeticoes: int = 1) -> dict:
+    # Menor tempo entre as repetições e, à parte (o tracemalloc deixa tudo mais lento), o pico de memória.
+    tempos = []
+    for _ in range(max(repeticoes, 1)):
+        estado = preparo() if preparo is not None else None
+        inicio = time.perf_counter()
+        retorno = funcao(estado)
+        tempos.append(time.perf_counter() - inicio)
+    medida = {"segundos": round(min(tempos), 4), "retorno": retorno}
+    if memoria:
+        estado = preparo() if preparo is not None else None
+        tracemalloc.start()
+        try:
+            funcao(estado)
+            medida["pico_memoria_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+        finally:
+            tracemalloc.stop()
+    return medida
+
+
+def _registro(resultados: list, fase: str, medida: dict, itens: int, unidade: str, **extras):
+    segundos = medida["segundos"]
+    registro = {"fase": fase, **extras, "segundos": segundos,
+                f"{unidade}_por_segundo": round(itens / segundos) if segundos else None}
+    if "pico_memoria_mb" in medida:
+        registro["pico_memoria_mb"] = medida["pico_memoria_mb"]
+    resultados.append(registro)
+    logging.info("%s %s: %.3f s", fase, " ".join(f"{k}={v}" for k, v in extras.items()), segundos)
+
+
+def _radical_disponivel() -> bool:
+    # Sem as regras RSLP locais o modo radical fica de fora; o benchmark não usa a rede.
+    try:
+        carregar_rslp()
+        return True
+    except (ImportError, RuntimeError):
+        return False
+
+
+def _copia(resultado: ResultadoBusca) -> ResultadoBusca:
+    # Resultado sem os valores/linhas já lidos, para a exportação medir também essa leitura.
+    return ResultadoBusca(resultado.planilha, resultado.palavras, resultado.colunas, resultado.palavra,
+                          resultado.indice, resultado.coluna, resultado.posicao, resultado.nota)
+
+
+def medir_tamanho(caminho: str, linhas: int, args, diretorio: str) -> list[dict]:
+    resultados = []
+    opcoes = {"memoria": not args.sem_memoria, "repeticoes": args.repeticoes}
+    comum = {"linhas": linhas, "colunas": args.colunas + 2}
+
+    # ---- Leitura ----
+    medida = _medir(lambda _: PlanilhaExcel(caminho, "Dados").carregar(), **opcoes)
+    celulas = medida["retorno"].size
+    _registro(resultados, "carregar", medida, celulas, "celulas", **comum)
+
+    cache = CachePersistente(os.path.join(diretorio, "cache"))
+    PlanilhaExcel(caminho, "Dados", cache=cache).carregar()
+    medida = _medir(lambda _: PlanilhaExcel(caminho, "Dados", cache=cache).carregar(), **opcoes)
+    _registro(resultados, "carregar_cache", medida, celulas, "celulas", **comum)
+
+    planilha = PlanilhaExcel(caminho, "Dados")
+    planilha.carregar()
+    colunas = planilha.colunas
+
+    # ---- Preparo do texto ----
+    radical = _radical_disponivel()
+    medida = _medir(lambda motor: motor._prepare_caches(colunas, need_stem=False, need_index=True),
+                    lambda: MotorBusca(planilha, processos=args.processos), **opcoes)
+    _registro(resultados, "preparar", medida, celulas, "celulas", **comum, tipo="normalizado")
+    if radical:
+        medida = _medir(lambda motor: motor._prepare_caches(colunas, need_stem=True, need_index=True),
+                        lambda: MotorBusca(planilha, processos=args.processos), **opcoes)
+        _registro(resultados, "preparar", medida, celulas, "celulas", **comum, tipo="radical")
+
+    # ---- Busca: caches de texto prontos; índices de similaridade e consultas refeitos a cada vez ----
+    motor = MotorBusca(planilha, processos=args.processos)
+    motor._prepare_caches(colunas, need_stem=radical, need_index=True)
+
+    def motor_limpo():
+        motor.consultas.limpar()
+        motor.distintos.clear()
+        motor.indice_qgramas.clear()
+        return motor
+
+    ultimo = None
+    for modo in MODOS_BUSCA:
+        if modo == "radical" and not radical:
+            resultados.append({"fase": "buscar", **comum, "modo": modo, "ignorado": "regras RSLP do NLTK ausentes"})
+            continue
+        for n in args.palavras:
+            palavras = palavras_busca(n)
+            medida = _medir(lambda m: m.buscar_palavras_chave(palavras, modo=modo, limiar=args.limiar),
+                            motor_limpo, **opcoes)
+            resultado = medida["retorno"]
+            _registro(resultados, "buscar", medida, celulas, "celulas", **comum, modo=modo, palavras=n,
+                      ocorrencias=resultado.total_ocorrencias)
+            if modo == "similaridade":
+                ultimo = resultado
+
+    # ---- Exportação do maior resultado de similaridade ----
+    if ultimo is not None and len(ultimo):
+        cabecalho = colunas_registros(colunas)
+        for formato in args.formatos:
+            saida = os.path.join(diretorio, f"exportacao.{formato}")
+
+            def exportar(resultado):
+                with EscritorRegistros(saida, cabecalho) as escritor:
+                    return escritor.escrever(registros_em_blocos(resultado))
+
+            medida = _medir(exportar, lambda: _copia(ultimo), **opcoes)
+            _registro(resultados, "exportar", medida, medida["retorno"], "registros", **comum, formato=formato,
+                      registros=medida["retorno"])
+            os.remove(saida)
+    return resultados
+
+
+def _ambiente() -> dict:
+    from importlib.metadata import PackageNotFoundError, version
+
+    ambiente = {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+    }
+    for pacote in ("pandas", "numpy", "openpyxl", "rapidfuzz", "regex", "nltk"):
+        try:
+            ambiente[pacote] = version(pacote)
+        except PackageNotFoundError:
+            ambiente[pacote] = None
+    return ambiente
+
+
+def _pico_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / 1024 ** (2 if sys.platform == "darwin" else 1), 1)
+
+
+# ===================== Linha de comando =====================
+def _inteiros(texto: str) -> list[int]:
+    return [int(t) for t in texto.split(",") if t.strip()]
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mede leitura, preparo, busca e exportação em planilhas sintéticas.")
+    parser.add_argument("--linhas", type=_inteiros, default=[10_000, 50_000],
+                        help="Tamanhos das planilhas, separados por vírgula (padrão: 10000,50000)")
+    parser.add_argument("--colunas", type=int, default=3, help="Colunas de texto (além de uma numérica e uma de datas)")
+    parser.add_argument("--tamanho-texto", type=int, default=60, help="Tamanho aproximado de cada texto, em caracteres")
+    parser.add_argument("--repeticao", type=float, default=0.3, help="Fração de células com frases repetidas")
+    parser.add_argument("--palavras", type=_inteiros, default=[1, 5, 20],
+                        help="Quantidades de palavras-chave buscadas (padrão: 1,5,20)")
+    parser.add_argument("-l", "--limiar", type=int, default=80, help="%% de similaridade (modo similaridade)")
+    parser.add_argument("--formatos", type=lambda t: [f.strip() for f in t.split(",") if f.strip()],
+                        default=["csv", "xlsx"], help="Formatos da exportação (padrão: csv,xlsx)")
+    parser.add_argument("-j", "--processos", type=int, default=1,
+                        help="Processos da busca (padrão: 1, para resultados comparáveis entre máquinas)")
+    parser.add_argument("--semente", type=int, default=0, help="Semente das planilhas sintéticas")
+    parser.add_argument("--dir", help="Diretório para as planilhas geradas (reaproveitadas entre execuções)")
+    parser.add_argument("-r", "--repeticoes", type=int, default=3,
+                        help="Execuções cronometradas de cada fase; vale a mais rápida (padrão: 3)")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="Não medir o pico de memória (evita uma execução extra de cada fase)")
+    parser.add_argument("-o", "--saida", help="Arquivo JSON do relatório (padrão: saída padrão)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = criar_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+
+    diretorio = args.dir or os.path.join(tempfile.gettempdir(), "busca_palavra_chave_benchmark")
+    os.makedirs(diretorio, exist_ok=True)
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": _ambiente(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "dir")},
+        "resultados": [],
+    }
+    with tempfile.TemporaryDirectory(dir=diretorio) as trabalho:
+        for linhas in args.linhas:
+            caminho = _planilha_sintetica(diretorio, linhas, args)
+            relatorio["resultados"].extend(medir_tamanho(caminho, linhas, args, trabalho))
+    relatorio["pico_rss_mb"] = _pico_rss_mb()
+
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Busca das mesmas palavras-chave em várias abas de vários arquivos Excel."""
+import glob
+import logging
+import os
+from concurrent.futures import wait
+from typing import Iterator, List
+
+import numpy as np
+
+from cache_persistente import CachePersistente
+from diagnostico import diagnostico
+from motor_busca import (INTERVALO_VERIFICACAO, BuscaCancelada, ControleBusca, MotorBusca, PlanilhaExcel,
+                         ResultadoBusca, abrir_excel, colunas_registros, ler_colunas_excel, registros_agrupados,
+                         registros_em_blocos)
+
+EXTENSOES_EXCEL = (".xlsx", ".xlsm")
+
+
+def expandir_arquivos(entradas: List[str], extensoes: tuple[str, ...] = EXTENSOES_EXCEL) -> list[str]:
+    """Arquivos de cada entrada: o próprio arquivo, os de uma pasta (e subpastas) ou os de um glob."""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = sorted(glob.glob(os.path.join(glob.escape(entrada), "**", "*"), recursive=True))
+        elif glob.has_magic(entrada):
+            candidatos = sorted(glob.glob(entrada, recursive=True))
+        else:
+            arquivos.append(entrada)
+            continue
+        # "~$..." são os arquivos de bloqueio que o Excel cria enquanto a planilha está aberta.
+        arquivos.extend(c for c in candidatos if c.lower().endswith(extensoes)
+                        and not os.path.basename(c).startswith("~$") and os.path.isfile(c))
+    return list(dict.fromkeys(arquivos))
+
+
+def _ler_colunas_aba(caminho: str, aba: str, cabecalho: list, largura: int,
+                     colunas: list) -> tuple[dict, int, tuple[dict, dict]]:
+    # Roda num processo do pool do motor: lê (sem cache) só as colunas pedidas de uma aba, partindo do
+    # cabeçalho e da largura conhecidos no processo principal (a aba não é medida de novo); retorna as
+    # colunas lidas, a largura real da aba e as medições do processo.
+    diagnostico.limpar()
+    lidas, largura = ler_colunas_excel(caminho, aba, cabecalho, largura, colunas)
+    return lidas, largura, diagnostico.instantaneo()
+
+
+class ResultadoLote(ResultadoBusca):
+    """Resultados de várias abas juntos, com a origem (arquivo, aba) de cada ocorrência.
+
+    ``fonte`` aponta para ``fontes`` e ``local`` para a posição da ocorrência no resultado da
+    própria aba; ``coluna`` usa a união das colunas pesquisadas em todas as abas.
+    """
+
+    def __init__(self, palavras: list[str], colunas: list, fontes: list[tuple[str, str, ResultadoBusca]],
+                 fonte=(), local=(), palavra=(), indice=(), coluna=(), posicao=(), nota=()):
+        super().__init__(None, palavras, colunas, palavra, indice, coluna, posicao, nota)
+        self.fontes = fontes
+        self.fonte = np.asarray(fonte, dtype=np.int32)
+        self.local = np.asarray(local, dtype=np.int64)
+
+    @classmethod
+    def juntar(cls, fontes: list[tuple[str, str, ResultadoBusca]], palavras: list[str] | None = None) -> "ResultadoLote":
+        """Junta os resultados na ordem (arquivo/aba, palavra, linha, coluna)."""
+        palavras = palavras if palavras is not None else (fontes[0][2].palavras if fontes else [])
+        colunas = list(dict.fromkeys(c for _, _, r in fontes for c in r.colunas))
+        posicao_coluna = {c: n for n, c in enumerate(colunas)}
+        if not any(len(r) for _, _, r in fontes):
+            lote = cls(palavras, colunas, fontes)
+        else:
+            partes = [(np.full(len(r), f), np.arange(len(r)), r.palavra, r.indice,
+                       np.array([posicao_coluna[c] for c in r.colunas], dtype=np.int32)[r.coluna], r.posicao, r.nota)
+                      for f, (_, _, r) in enumerate(fontes) if len(r)]
+            lote = cls(palavras, colunas, fontes, *(np.concatenate(a) for a in zip(*partes)))
+        lote.avisos = {p: m for _, _, r in fontes for p, m in r.avisos.items()}
+        return lote
+
+    def selecionar(self, selecao) -> "ResultadoLote":
+        sub = ResultadoLote(self.palavras, self.colunas, self.fontes, self.fonte[selecao], self.local[selecao],
+                            self.palavra[selecao], self.indice[selecao], self.coluna[selecao],
+                            self.posicao[selecao], self.nota[selecao])
+        if self._valores is not None:
+            sub._valores = self._valores[selecao]
+        sub.avisos = self.avisos
+        return sub
+
+    def _chaves_ordenacao(self) -> dict[str, np.ndarray]:
+        return {**super()._chaves_ordenacao(), 'origem': self.fonte}
+
+    def _desempate(self) -> tuple:
+        return self.coluna, self.indice, self.fonte, self.palavra
+
+    def valores(self) -> np.ndarray:
+        if self._valores is None:
+            valores = np.empty(len(self.indice), dtype=object)
+            for f in np.unique(self.fonte):
+                mascara = self.fonte == f
+                valores[mascara] = self.fontes[f][2].selecionar(self.local[mascara]).valores()
+            self._valores = valores
+        return self._valores
+
+    def linhas_completas(self) -> dict:
+        """{(arquivo, aba): {indice: {coluna: valor}}} das linhas com ocorrências, lidas de cada aba."""
+        linhas = {}
+        for f in np.unique(self.fonte):
+            arquivo, aba, resultado = self.fontes[f]
+            linhas[(arquivo, aba)] = resultado.selecionar(self.local[self.fonte == f]).linhas_completas()
+        return linhas
+
+    def ocorrencias(self) -> Iterator[dict]:
+        for n, item in enumerate(super().ocorrencias()):
+            arquivo, aba, _ = self.fontes[self.fonte[n]]
+            yield {'arquivo': arquivo, 'aba': aba, **item}
+
+
+def colunas_lote(lote: ResultadoLote, agrupado: bool = False) -> list[str]:
+    """Cabeçalho de exportação do lote: as colunas originais de todas as abas, mais ARQUIVO e ABA."""
+    colunas = (c for _, _, resultado in lote.fontes for c in resultado.planilha.colunas)
+    return colunas_registros(colunas, ['ARQUIVO', 'ABA'], agrupado)
+
+
+def registros_lote(lote: ResultadoLote, agrupado: bool = False) -> Iterator[dict]:
+    """Registros de exportação de todas as abas, com as colunas ``ARQUIVO`` e ``ABA``."""
+    gerar = registros_agrupados if agrupado else registros_em_blocos
+    for arquivo, aba, resultado in lote.fontes:
+        yield from gerar(resultado, {'ARQUIVO': arquivo, 'ABA': aba})
+
+
+class BuscaLote:
+    """Busca as mesmas palavras em várias abas de vários arquivos, com um só motor.
+
+    ``preparar`` lê só os nomes das abas e os cabeçalhos. Em ``executar``, enquanto uma aba é
+    pesquisada, as colunas das próximas são lidas em paralelo no pool de processos do motor (até
+    ``motor.processos`` leituras adiantadas); colunas já presentes no cache em disco não são relidas.
+    """
+
+    def __init__(self, motor: MotorBusca, arquivos: List[str], abas: List[str] | None = None,
+                 todas_abas: bool = False, cache: CachePersistente | None = None):
+        self.motor = motor
+        self.arquivos = list(arquivos)
+        self.abas = abas
+        self.todas_abas = todas_abas
+        self.cache = cache
+        self.planilhas: list[tuple[str, str, PlanilhaExcel]] = []
+        self.falhas: list[tuple[str, str | None, str]] = []
+        self.resultados: list[tuple[str, str, ResultadoBusca]] = []
+        self.processadas = 0
+
+    def preparar(self) -> list[tuple[str, str, PlanilhaExcel]]:
+        for arquivo in self.arquivos:
+            try:
+                excel = abrir_excel(arquivo)
+            except Exception as e:
+                logging.exception("Erro ao abrir %s", arquivo)
+                self.falhas.append((arquivo, None, str(e)))
+                continue
+            # Só os nomes das abas e os cabeçalhos: o arquivo é fechado logo em seguida (lotes com
+            # milhares de arquivos esgotariam os descritores) e reaberto quando as colunas forem lidas.
+            try:
+                for aba in (excel.sheet_names if self.todas_abas else (self.abas or excel.sheet_names[:1])):
+                    try:
+                        self.planilhas.append((arquivo, aba, PlanilhaExcel(arquivo, aba, excel, self.cache)))
+                    except Exception as e:
+                        logging.exception("Erro ao abrir %s [%s]", arquivo, aba)
+                        self.falhas.append((arquivo, aba, str(e)))
+            finally:
+                excel.close()
+        return self.planilhas
+
+    @property
+    def colunas(self) -> list:
+        """União das colunas de todas as abas (na ordem em que aparecem)."""
+        return list(dict.fromkeys(c for _, _, planilha in self.planilhas for c in planilha.colunas))
+
+    def executar(self, palavras: List[str], colunas_especificas: List[str] | None = None,
+                 modo: str = "similaridade", limiar: int = 80,
+                 controle: ControleBusca | None = None,
+                 acumular: bool = True) -> Iterator[tuple[str, str, ResultadoBusca]]:
+        """Gera (arquivo, aba, resultado) de cada aba, na ordem de ``planilhas``.
+
+        Abas com erro são registradas em ``falhas`` e a busca segue; com ``controle``, o
+        cancelamento interrompe o lote inteiro (``BuscaCancelada``). Com ``acumular``, os
+        resultados ficam também em ``resultados`` (para ``consolidar``); sem ele, cada aba é
+        descartada da memória assim que o consumidor pede a próxima.
+        """
+        if not self.planilhas:
+            self.preparar()
+        adiantar = self.motor.processos if self.motor.processos > 1 and len(self.planilhas) > 1 else 0
+        leituras: dict[int, object] = {}
+
+        def agendar(n: int):
+            _, _, planilha = self.planilhas[n]
+            colunas = [c for c in (colunas_especificas or planilha.colunas) if c in planilha.colunas]
+            try:
+                faltando = planilha.carregar_do_cache(colunas)
+            except Exception:
+                logging.exception("Erro ao ler o cache de %s [%s]", planilha.caminho, planilha.aba)
+                faltando = []
+            if faltando:
+                leituras[n] = self.motor.pool().submit(_ler_colunas_aba, planilha.caminho, planilha.aba,
+                                                       planilha._cabecalho, len(planilha.colunas), faltando)
+
+        proxima = 0
+        try:
+            for n, (arquivo, aba, planilha) in enumerate(self.planilhas):
+                if controle is not None:
+                    controle.verificar()
+                while adiantar and proxima < len(self.planilhas) and proxima <= n + adiantar:
+                    agendar(proxima)
+                    proxima += 1
+                try:
+                    if n in leituras:
+                        # A leitura antecipada pode ser longa: o cancelamento é conferido enquanto ela roda.
+                        while controle is not None and not leituras[n].done():
+                            controle.verificar()
+                            wait([leituras[n]], timeout=INTERVALO_VERIFICACAO)
+                        lidas, largura, medicoes = leituras.pop(n).result()
+                        diagnostico.somar(medicoes)
+                        planilha.adicionar_colunas(lidas, largura)
+                    self.motor.definir_planilha(planilha)
+                    resultado = self.motor.buscar_palavras_chave(palavras, colunas_especificas, modo, limiar,
+                                                                 controle)
+                except BuscaCancelada:
+                    raise
+                except Exception as e:
+                    logging.exception("Erro ao processar %s [%s]", arquivo, aba)
+                    self.falhas.append((arquivo, aba, str(e)))
+                    continue
+                finally:
+                    self.motor.definir_planilha(None)
+                    self.processadas += 1
+                logging.info("%s [%s]: %d ocorrência(s)", arquivo, aba, resultado.total_ocorrencias)
+                if acumular:
+                    self.resultados.append((arquivo, aba, resultado))
+                yield arquivo, aba, resultado
+                # Com cache em disco, as colunas voltam de lá se a exibição/exportação precisar delas.
+                if not acumular or planilha.cache is not None:
+                    planilha.liberar()
+        finally:
+            for futuro in leituras.values():
+                futuro.cancel()
+
+    def consolidar(self) -> ResultadoLote:
+        return ResultadoLote.juntar(self.resultados)
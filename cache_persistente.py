@@ -0,0 +1,214 @@
+"""Cache em disco de planilhas lidas e colunas normalizadas, para reabrir arquivos sem reprocessá-los."""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from diagnostico import diagnostico
+
+LIMITE_PADRAO = 2 * 1024 ** 3
+
+# Acessos e hashes novos só vão para o indice.json no máximo a cada tantos segundos (ou em ``sincronizar``).
+INTERVALO_GRAVACAO_INDICE = 5.0
+
+
+def diretorio_padrao() -> str:
+    if os.environ.get("BUSCA_CACHE_DIR"):
+        return os.environ["BUSCA_CACHE_DIR"]
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        return os.path.join(os.environ["LOCALAPPDATA"], "BuscaPalavraChave", "cache")
+    return os.path.join(os.path.expanduser("~"), ".cache", "busca_palavra_chave")
+
+
+class CachePersistente:
+    """Objetos serializados em disco, com descarte dos menos usados (LRU) acima de ``limite_bytes``.
+
+    As entradas ficam em arquivos ``.pkl`` e o ``indice.json`` guarda tamanho e último acesso de
+    cada uma, além do hash de conteúdo já calculado para cada (caminho, tamanho, mtime). O hash de
+    um arquivo sai do índice quando todas as entradas dele são descartadas. Arquivos ``.pkl`` que o
+    índice não conhece (deixados por outro processo na mesma pasta) contam para o limite e são os
+    primeiros a ser descartados.
+
+    Entradas novas e descartes gravam o índice na hora; leituras e hashes novos são gravados em lote
+    (ver ``INTERVALO_GRAVACAO_INDICE``), e ``sincronizar`` grava o que estiver pendente. Se o programa
+    cair antes disso, perde-se só a ordem de uso e hashes que serão recalculados.
+    """
+
+    def __init__(self, diretorio: str | None = None, limite_bytes: int = LIMITE_PADRAO):
+        self.diretorio = diretorio or diretorio_padrao()
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._indice = self._ler_indice()
+        self._pendente = False
+        self._ultima_gravacao = time.monotonic()
+
+    # ===================== Índice =====================
+    def _caminho_indice(self) -> str:
+        return os.path.join(self.diretorio, "indice.json")
+
+    def _ler_indice(self) -> dict:
+        try:
+            with open(self._caminho_indice(), encoding="utf-8") as f:
+                indice = json.load(f)
+            if isinstance(indice, dict):
+                indice.setdefault("entradas", {})
+                indice.setdefault("arquivos", {})
+                return indice
+        except (OSError, ValueError):
+            pass
+        return {"entradas": {}, "arquivos": {}}
+
+    def _gravar_indice(self):
+        self._gravar_atomico(self._caminho_indice(), json.dumps(self._indice).encode("utf-8"))
+        self._pendente = False
+        self._ultima_gravacao = time.monotonic()
+
+    def _alterar_indice(self):
+        # Mudança que pode esperar: grava só se a última gravação já tem INTERVALO_GRAVACAO_INDICE.
+        self._pendente = True
+        if time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO_INDICE:
+            self._gravar_indice()
+
+    def sincronizar(self):
+        """Grava no ``indice.json`` os acessos e hashes ainda pendentes."""
+        with self._lock:
+            if self._pendente:
+                self._gravar_indice()
+
+    def _gravar_atomico(self, destino: str, dados: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, destino)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _arquivo_entrada(self, chave: str) -> str:
+        nome = hashlib.sha1(chave.encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, nome + ".pkl")
+
+    # ===================== Assinatura de arquivos =====================
+    def assinatura(self, caminho: str) -> str:
+        """Hash do conteúdo do arquivo; só é recalculado quando caminho, tamanho ou mtime mudam."""
+        caminho = os.path.abspath(caminho)
+        st = os.stat(caminho)
+        chave = f"{caminho}|{st.st_size}|{st.st_mtime_ns}"
+        with self._lock:
+            conhecido = self._indice["arquivos"].get(caminho)
+            if conhecido and conhecido["chave"] == chave:
+                return conhecido["hash"]
+
+        h = hashlib.blake2b(digest_size=20)
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloco)
+        digest = f"{h.hexdigest()}-{st.st_size}"
+
+        with self._lock:
+            self._indice["arquivos"][caminho] = {"chave": chave, "hash": digest}
+            self._alterar_indice()
+        return digest
+
+    def chave_planilha(self, caminho: str, aba: str | int) -> str:
+        return f"{self.assinatura(caminho)}|{aba!r}"
+
+    # ===================== Entradas =====================
+    def obter(self, chave: str):
+        with self._lock:
+            entrada = self._indice["entradas"].get(chave)
+            if entrada is None:
+                diagnostico.cache("cache_disco", falhas=1)
+                return None
+            try:
+                with open(self._arquivo_entrada(chave), "rb") as f:
+                    obj = pickle.load(f)
+            except Exception:
+                logging.warning("Entrada de cache inválida descartada: %s", chave)
+                self._remover(chave)
+                self._podar_arquivos()
+                self._gravar_indice()
+                return None
+            entrada["ultimo_acesso"] = time.time()
+            self._alterar_indice()
+            diagnostico.cache("cache_disco", acertos=1)
+            return obj
+
+    def guardar(self, chave: str, obj):
+        dados = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(dados) > self.limite_bytes:
+            return
+        with self._lock:
+            self._gravar_atomico(self._arquivo_entrada(chave), dados)
+            self._indice["entradas"][chave] = {"bytes": len(dados), "ultimo_acesso": time.time()}
+            self._descartar_excesso()
+            self._gravar_indice()
+
+    def limpar(self):
+        with self._lock:
+            for chave in list(self._indice["entradas"]):
+                self._remover(chave)
+            for caminho, _ in self._arquivos_orfaos():
+                self._apagar(caminho)
+            self._indice["arquivos"].clear()
+            self._gravar_indice()
+
+    def tamanho_total(self) -> int:
+        return sum(e["bytes"] for e in self._indice["entradas"].values())
+
+    def _remover(self, chave: str):
+        self._indice["entradas"].pop(chave, None)
+        self._apagar(self._arquivo_entrada(chave))
+
+    @staticmethod
+    def _apagar(caminho: str) -> bool:
+        try:
+            os.remove(caminho)
+            return True
+        except OSError:
+            return False
+
+    def _arquivos_orfaos(self) -> list[tuple[str, int]]:
+        # ``.pkl`` sem entrada no índice: sobra de outro processo que usa a mesma pasta e regravou o
+        # indice.json por cima deste (ou de uma queda entre gravar a entrada e o índice).
+        conhecidos = {os.path.basename(self._arquivo_entrada(c)) for c in self._indice["entradas"]}
+        orfaos = []
+        with os.scandir(self.diretorio) as itens:
+            for item in itens:
+                if item.name.endswith(".pkl") and item.name not in conhecidos:
+                    try:
+                        orfaos.append((item.path, item.stat().st_size))
+                    except OSError:
+                        pass
+        return orfaos
+
+    def _descartar_excesso(self):
+        # Órfãos contam para o limite e são os primeiros a sair: nenhum índice os encontra mais.
+        orfaos = self._arquivos_orfaos()
+        total = self.tamanho_total() + sum(tamanho for _, tamanho in orfaos)
+        if total <= self.limite_bytes:
+            return
+        for caminho, tamanho in orfaos:
+            if self._apagar(caminho):
+                total -= tamanho
+        for chave, entrada in sorted(self._indice["entradas"].items(), key=lambda kv: kv[1]["ultimo_acesso"]):
+            if total <= self.limite_bytes:
+                break
+            self._remover(chave)
+            total -= entrada["bytes"]
+        self._podar_arquivos()
+
+    def _podar_arquivos(self):
+        # As chaves das entradas de um arquivo contêm o hash dele (ver ``chave_planilha``); hash que
+        # não aparece em nenhuma chave restante não tem mais o que identificar.
+        chaves = "\n".join(self._indice["entradas"])
+        arquivos = self._indice["arquivos"]
+        for caminho in [c for c, a in arquivos.items() if a["hash"] not in chaves]:
+            del arquivos[caminho]
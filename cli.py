@@ -0,0 +1,168 @@
+"""Busca de palavras-chave em lote, pela linha de comando (sem interface gráfica).
+
+Exemplo:
+    python cli.py planilha1.xlsx planilha2.xlsx -p "arquivamento, arquivar" -m radical -o resultados.xlsx
+    python cli.py pasta_de_planilhas/ --todas-abas -p "arquivamento" -o resultados.csv
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+
+from busca_lote import EXTENSOES_EXCEL, BuscaLote, expandir_arquivos
+from cache_persistente import CachePersistente
+from diagnostico import FERRAMENTAS_PERFIL, diagnostico
+from motor_busca import (MODOS_BUSCA, EscritorRegistros, MotorBusca, abrir_excel, colunas_registros, ler_blocos,
+                         ler_cabecalho, registros_agrupados, registros_em_blocos, registros_em_fluxo)
+
+
+def _separar(texto: str) -> list[str]:
+    return [p.strip() for p in texto.split(",") if p.strip()]
+
+
+def _ler_palavras(args) -> list[str]:
+    palavras = []
+    for texto in args.palavras or []:
+        palavras.extend(_separar(texto))
+    if args.arquivo_palavras:
+        with open(args.arquivo_palavras, encoding="utf-8") as f:
+            for linha in f:
+                palavras.extend(_separar(linha))
+    return list(dict.fromkeys(palavras))
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Busca palavras-chave em planilhas Excel e grava os resultados em arquivo."
+    )
+    parser.add_argument("arquivos", nargs="+",
+                        help="Arquivos Excel (.xlsx), pastas (com subpastas) ou padrões glob, p.ex. 'dados/*.xlsx'")
+    parser.add_argument("-p", "--palavras", action="append",
+                        help="Palavras-chave separadas por vírgula (pode repetir)")
+    parser.add_argument("-P", "--arquivo-palavras",
+                        help="Arquivo texto com palavras-chave (uma por linha ou separadas por vírgula)")
+    parser.add_argument("-a", "--aba", action="append", dest="abas",
+                        help="Aba a pesquisar (pode repetir; padrão: primeira aba)")
+    parser.add_argument("--todas-abas", action="store_true", help="Pesquisar todas as abas de cada arquivo")
+    parser.add_argument("-c", "--colunas", help="Buscar apenas nestas colunas (separadas por vírgula)")
+    parser.add_argument("-m", "--modo", choices=MODOS_BUSCA, default="similaridade", help="Modo de busca")
+    parser.add_argument("-l", "--limiar", type=int, default=80, help="%% de similaridade (modo similaridade)")
+    parser.add_argument("-o", "--saida", required=True, help="Arquivo de saída (.xlsx, .csv ou .parquet)")
+    parser.add_argument("--agrupar", action="store_true",
+                        help="Gravar cada linha encontrada uma vez só, com a lista de ocorrências")
+    parser.add_argument("-j", "--processos", type=int,
+                        help="Processos para a busca e para ler as próximas abas durante a busca "
+                             "(padrão: número de núcleos; 1 desativa o paralelismo)")
+    parser.add_argument("--fluxo", action="store_true",
+                        help="Ler e buscar em blocos, com memória limitada (para planilhas maiores que a RAM; "
+                             "aceita também .csv na entrada)")
+    parser.add_argument("--tamanho-bloco", type=int, default=50_000, help="Linhas por bloco no modo --fluxo")
+    parser.add_argument("--dir-cache", help="Diretório do cache em disco (padrão: cache do usuário)")
+    parser.add_argument("--limite-cache", type=int, default=2048, help="Tamanho máximo do cache em MB")
+    parser.add_argument("--sem-cache", action="store_true", help="Não usar o cache em disco")
+    parser.add_argument("--diagnostico", metavar="ARQUIVO.json",
+                        help="Gravar tempo, chamadas, linhas e acertos de cache de cada fase")
+    parser.add_argument("--perfil", choices=FERRAMENTAS_PERFIL,
+                        help="Gravar também o perfil da execução (no --diagnostico, ou na saída de erros)")
+    return parser
+
+
+def _alvos_fluxo(arquivos: list[str], abas: list[str] | None, todas_abas: bool):
+    for arquivo in arquivos:
+        if arquivo.lower().endswith(".csv"):
+            yield arquivo, None
+            continue
+        excel = abrir_excel(arquivo)
+        nomes_abas = excel.sheet_names
+        excel.close()
+        for aba in (nomes_abas if todas_abas else (abas or nomes_abas[:1])):
+            yield arquivo, aba
+
+
+def _executar_fluxo(args, palavras: list[str], colunas: list[str] | None) -> int:
+    if args.agrupar:
+        logging.error("A opção --agrupar não está disponível no modo --fluxo.")
+        return 2
+    arquivos = expandir_arquivos(args.arquivos, EXTENSOES_EXCEL + (".csv",))
+    alvos = list(_alvos_fluxo(arquivos, args.abas, args.todas_abas))
+    cabecalho = colunas_registros((c for arquivo, aba in alvos for c in ler_cabecalho(arquivo, aba)), ['ARQUIVO', 'ABA'])
+
+    motor = MotorBusca(processos=args.processos)
+
+    def registros():
+        for arquivo, aba in alvos:
+            blocos = ler_blocos(arquivo, aba, args.tamanho_bloco)
+            ocorrencias = motor.buscar_em_fluxo(blocos, palavras, colunas, modo=args.modo, limiar=args.limiar)
+            yield from registros_em_fluxo(ocorrencias, {'ARQUIVO': arquivo, 'ABA': aba or ""})
+
+    try:
+        with EscritorRegistros(args.saida, cabecalho) as escritor:
+            total = escritor.escrever(registros())
+    finally:
+        motor.encerrar()
+    logging.info("Total de ocorrências: %d | resultados gravados em %s", total, args.saida)
+    return 0
+
+
+def _executar_lote(args, palavras: list[str], colunas: list[str] | None) -> int:
+    cache = None if args.sem_cache else CachePersistente(args.dir_cache, args.limite_cache * 1024 ** 2)
+    arquivos = expandir_arquivos(args.arquivos)
+    if not arquivos:
+        logging.error("Nenhum arquivo Excel encontrado em: %s", ", ".join(args.arquivos))
+        return 2
+    motor = MotorBusca(cache=cache, processos=args.processos)
+
+    # Só os cabeçalhos são lidos aqui; as colunas de cada aba são carregadas na hora da busca.
+    lote = BuscaLote(motor, arquivos, args.abas, args.todas_abas, cache)
+    lote.preparar()
+    cabecalho = colunas_registros(lote.colunas, ['ARQUIVO', 'ABA'], agrupado=args.agrupar)
+    gerar_registros = registros_agrupados if args.agrupar else registros_em_blocos
+    total = 0
+    try:
+        with EscritorRegistros(args.saida, cabecalho) as escritor:
+            for arquivo, aba, resultado in lote.executar(palavras, colunas, modo=args.modo, limiar=args.limiar,
+                                                         acumular=False):
+                escritor.escrever(gerar_registros(resultado, {'ARQUIVO': arquivo, 'ABA': aba}))
+                total += resultado.total_ocorrencias
+                for palavra, motivo in resultado.avisos.items():
+                    logging.warning("%s [%s]: palavra %r ignorada, %s", arquivo, aba, palavra, motivo)
+    finally:
+        motor.encerrar()
+    logging.info("Total de ocorrências: %d em %d aba(s) | resultados gravados em %s",
+                 total, lote.processadas, args.saida)
+    return 1 if lote.falhas else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = criar_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    palavras = _ler_palavras(args)
+    if not palavras:
+        logging.error("Informe pelo menos uma palavra-chave (-p ou -P).")
+        return 2
+    colunas = _separar(args.colunas) if args.colunas else None
+    # A saída é conferida antes de abrir qualquer planilha: um formato indisponível só apareceria no fim.
+    try:
+        EscritorRegistros.formato_de(args.saida)
+    except RuntimeError as e:
+        logging.error("%s", e)
+        return 2
+    diagnostico.perfil_ativo = args.perfil is not None
+    diagnostico.ferramenta_perfil = args.perfil or diagnostico.ferramenta_perfil
+    try:
+        with diagnostico.perfilar():
+            if args.fluxo:
+                return _executar_fluxo(args, palavras, colunas)
+            return _executar_lote(args, palavras, colunas)
+    finally:
+        if args.diagnostico:
+            diagnostico.exportar(args.diagnostico)
+            logging.info("Diagnóstico gravado em %s", args.diagnostico)
+        elif diagnostico.ultimo_perfil:
+            print(diagnostico.ultimo_perfil, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Medições por fase (tempo, chamadas, linhas, acertos de cache) e perfil opcional da busca.
+
+As fases são registradas em ``diagnostico``, compartilhado por motor, planilhas, exportação e
+interface. Uma fase pode conter outras (``busca`` inclui ``similaridade``, por exemplo), então os
+tempos não devem ser somados. Nos processos de busca paralela, cada fragmento devolve suas
+medições, que são somadas às do processo principal: ali o tempo é a soma entre os processos.
+"""
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+FERRAMENTAS_PERFIL = ("cProfile", "pyinstrument")
+
+# Funções mostradas no relatório do cProfile.
+LINHAS_PERFIL = 40
+
+
+class Diagnostico:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fases: dict[str, list] = {}
+        self.caches: dict[str, list[int]] = {}
+        # ---- Perfil (desligado por padrão; custa caro) ----
+        self.perfil_ativo = False
+        self.ferramenta_perfil = "cProfile"
+        self.ultimo_perfil: str | None = None
+
+    # ===================== Registro =====================
+    @contextmanager
+    def medir(self, fase: str, chamadas: int = 1, linhas: int = 0):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(fase, time.perf_counter() - inicio, chamadas, linhas)
+
+    def registrar(self, fase: str, segundos: float = 0.0, chamadas: int = 1, linhas: int = 0):
+        with self._lock:
+            atual = self.fases.setdefault(fase, [0.0, 0, 0])
+            atual[0] += segundos
+            atual[1] += chamadas
+            atual[2] += linhas
+
+    def cache(self, nome: str, acertos: int = 0, falhas: int = 0):
+        with self._lock:
+            atual = self.caches.setdefault(nome, [0, 0])
+            atual[0] += acertos
+            atual[1] += falhas
+
+    def limpar(self):
+        with self._lock:
+            self.fases.clear()
+            self.caches.clear()
+            self.ultimo_perfil = None
+
+    # ===================== Troca entre processos =====================
+    def instantaneo(self) -> tuple[dict, dict]:
+        with self._lock:
+            return ({f: list(v) for f, v in self.fases.items()}, {c: list(v) for c, v in self.caches.items()})
+
+    def somar(self, dados: tuple[dict, dict]):
+        fases, caches = dados
+        for fase, (segundos, chamadas, linhas) in fases.items():
+            self.registrar(fase, segundos, chamadas, linhas)
+        for nome, (acertos, falhas) in caches.items():
+            self.cache(nome, acertos, falhas)
+
+    # ===================== Relatório =====================
+    def relatorio(self) -> dict:
+        fases, caches = self.instantaneo()
+        return {
+            "fases": {
+                fase: {"segundos": round(segundos, 4), "chamadas": chamadas, "linhas": linhas,
+                       "linhas_por_segundo": round(linhas / segundos) if linhas and segundos else None}
+                for fase, (segundos, chamadas, linhas) in sorted(fases.items(), key=lambda kv: -kv[1][0])
+            },
+            "caches": {
+                nome: {"acertos": acertos, "falhas": falhas,
+                       "taxa_acerto": round(acertos / (acertos + falhas), 4) if acertos + falhas else None}
+                for nome, (acertos, falhas) in sorted(caches.items())
+            },
+            "perfil": self.ultimo_perfil,
+        }
+
+    def exportar(self, caminho: str):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2)
+
+    # ===================== Perfil =====================
+    @contextmanager
+    def perfilar(self):
+        """Com ``perfil_ativo``, grava em ``ultimo_perfil`` o perfil (texto) do bloco executado."""
+        if not self.perfil_ativo:
+            yield
+            return
+        if self.ferramenta_perfil == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise RuntimeError("pyinstrument não está instalado (pip install pyinstrument).") from None
+            perfil = Profiler()
+            perfil.start()
+            try:
+                yield
+            finally:
+                perfil.stop()
+                self.ultimo_perfil = perfil.output_text(unicode=True)
+        else:
+            import cProfile
+            import pstats
+
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                yield
+            finally:
+                perfil.disable()
+                saida = io.StringIO()
+                pstats.Stats(perfil, stream=saida).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+                self.ultimo_perfil = saida.getvalue()
+
+
+diagnostico = Diagnostico()
@@ -1,35 +1,65 @@
+from __future__ import annotations
+
+import json
 import logging
-import re
+import multiprocessing
+import os
 import threading
+import time
 import tkinter as tk
-import unicodedata
-from tkinter import filedialog, messagebox, scrolledtext, ttk
-from typing import Dict, List
+from tkinter import filedialog, messagebox, ttk
+from typing import TYPE_CHECKING
+
+from cache_persistente import CachePersistente
+from diagnostico import FERRAMENTAS_PERFIL, diagnostico
+
+# pandas, numpy, rapidfuzz e nltk demoram a carregar: motor_busca e busca_lote só são importados depois
+# que a janela aparece (em segundo plano, ou na primeira vez em que forem usados).
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from busca_lote import BuscaLote
+    from motor_busca import ControleBusca, MotorBusca, PlanilhaExcel, ResultadoBusca
+
+# Ocorrências por página da tabela de resultados: só a página visível vira itens do Treeview.
+TAMANHO_PAGINA = 500
+COLUNAS_TABELA = [("origem", "Arquivo/Aba", 160), ("palavra", "Palavra", 140), ("linha", "Linha", 70), ("coluna", "Coluna", 140),
+                  ("nota", "Nota", 60), ("conteudo", "Conteúdo", 460)]
+
+# Durante a busca: atualização da barra de progresso (ms) e dos resultados parciais na tabela (ms).
+INTERVALO_PROGRESSO_MS = 200
+INTERVALO_PARCIAIS_MS = 1000
 
-import nltk
-import pandas as pd
-from nltk.stem import RSLPStemmer
-from rapidfuzz import fuzz
+# Faixa do slider de similaridade.
+LIMIAR_MINIMO, LIMIAR_MAXIMO = 60, 95
 
 
 class ExcelKeywordSearcherGUI:
     def __init__(self):
         # ---- Estado ----
-        self.df: pd.DataFrame | None = None
+        self.planilha: PlanilhaExcel | None = None
         self.arquivo_path: str | None = None
-        self.resultados: Dict | None = None
-        self.norm_cache: dict[str, pd.Series] = {}
-        self.stem_cache: dict[str, pd.Series] = {}
+        self.arquivos_lote: list[str] | None = None
+        self.lote: BuscaLote | None = None
+        self.resultados: ResultadoBusca | None = None
+        self.visao: ResultadoBusca | None = None
+        self.pagina = 0
+        self.ordem: tuple[str, bool] | None = None
+        self.controle: ControleBusca | None = None
+        self.janela_diagnostico: tk.Toplevel | None = None
+        self._parciais_exibidas = 0
+        self._ultima_parcial = 0.0
+        self._motor: MotorBusca | None = None
+        self._lock_motor = threading.Lock()
 
         # ---- Logging ----
         logging.basicConfig(
             level=logging.INFO,
             format="%(asctime)s %(levelname)s %(message)s"
         )
-        self._ensure_nltk()
 
-        # ---- Stemmer ----
-        self.stemmer = RSLPStemmer()
+        # ---- Cache em disco (o motor de busca é criado depois da janela) ----
+        self.cache = self._abrir_cache()
 
         # ---- UI raiz ----
         self.root = tk.Tk()
@@ -44,18 +74,26 @@ class ExcelKeywordSearcherGUI:
             pass
 
         self._build_ui()
+        threading.Thread(target=self._precarregar_motor, daemon=True).start()
+
+    # ===================== Motor de busca =====================
+    @property
+    def motor(self) -> MotorBusca:
+        with self._lock_motor:
+            if self._motor is None:
+                from motor_busca import MotorBusca
+                self._motor = MotorBusca(cache=self.cache)
+            return self._motor
+
+    def _precarregar_motor(self):
+        try:
+            self.motor
+        except Exception:
+            logging.exception("Falha ao carregar o motor de busca")
 
-    # ===================== Utilidades de texto =====================
-    def normalizar_texto(self, texto: str) -> str:
-        if not isinstance(texto, str):
-            texto = str(texto)
-        t = unicodedata.normalize('NFD', texto)
-        t = ''.join(ch for ch in t if unicodedata.category(ch) != 'Mn')
-        return t.lower()
-
-    def stem_pt(self, s: str) -> str:
-        tokens = re.findall(r"\w+", self.normalizar_texto(s))
-        return " ".join(self.stemmer.stem(t) for t in tokens)
+    def _preencher_modos(self):
+        from motor_busca import MODOS_BUSCA
+        self.combo_modo['values'] = MODOS_BUSCA
 
     # ===================== UI =====================
     def _build_ui(self):
@@ -78,8 +116,9 @@ class ExcelKeywordSearcherGUI:
         self.arquivo_var = tk.StringVar()
         ttk.Entry(lf_arq, textvariable=self.arquivo_var, state="readonly").grid(row=0, column=1, sticky="ew", padx=6)
         ttk.Button(lf_arq, text="Selecionar", command=self.selecionar_arquivo).grid(row=0, column=2)
+        ttk.Button(lf_arq, text="📁 Pasta", command=self.selecionar_pasta).grid(row=0, column=3, padx=(6, 0))
         self.info_arquivo = ttk.Label(lf_arq, text="Nenhum arquivo selecionado", foreground="gray")
-        self.info_arquivo.grid(row=1, column=0, columnspan=3, sticky="w", pady=(6, 0))
+        self.info_arquivo.grid(row=1, column=0, columnspan=4, sticky="w", pady=(6, 0))
 
         # Aba
         lf_aba = ttk.LabelFrame(main, text="📋 Aba do Excel", padding=10)
@@ -91,6 +130,8 @@ class ExcelKeywordSearcherGUI:
         self.aba_combo = ttk.Combobox(lf_aba, textvariable=self.aba_var, state="readonly")
         self.aba_combo.grid(row=0, column=1, sticky="ew", padx=6)
         self.aba_combo.bind('<<ComboboxSelected>>', self.trocar_aba)
+        self.todas_abas_var = tk.BooleanVar()
+        ttk.Checkbutton(lf_aba, text="Pesquisar todas as abas", variable=self.todas_abas_var).grid(row=0, column=2, padx=(6, 0))
 
         # Palavras
         lf_pal = ttk.LabelFrame(main, text="🔎 Palavras-chave", padding=10)
@@ -111,8 +152,9 @@ class ExcelKeywordSearcherGUI:
         # Modo
         ttk.Label(lf_ops, text="Modo de busca:").grid(row=0, column=0, sticky="w")
         self.modo_busca = tk.StringVar(value="similaridade") 
-        ttk.Combobox(lf_ops, textvariable=self.modo_busca, state="readonly",
-                     values=["exato", "padrão", "similaridade", "radical"]).grid(row=0, column=1, sticky="ew", padx=(6, 12))
+        self.combo_modo = ttk.Combobox(lf_ops, textvariable=self.modo_busca, state="readonly",
+                                       values=[self.modo_busca.get()], postcommand=self._preencher_modos)
+        self.combo_modo.grid(row=0, column=1, sticky="ew", padx=(6, 12))
 
         # Limiar fuzzy
         ttk.Label(lf_ops, text="% de Similaridade:").grid(row=0, column=2, sticky="w")
@@ -122,7 +164,7 @@ class ExcelKeywordSearcherGUI:
         self.lbl_limiar.grid(row=0, column=4, sticky="w")
         
         self.slider = ttk.Scale(
-            lf_ops, from_=60, to=95, orient="horizontal",
+            lf_ops, from_=LIMIAR_MINIMO, to=LIMIAR_MAXIMO, orient="horizontal",
             command=self._on_slider_change
         )
         self.slider.grid(row=0, column=3, sticky="ew", padx=6)
@@ -141,26 +183,72 @@ class ExcelKeywordSearcherGUI:
         self.btn_mostrar_colunas = ttk.Button(lf_ops, text="Ver Colunas", command=self.mostrar_colunas, state='disabled')
         self.btn_mostrar_colunas.grid(row=1, column=5, sticky="e", pady=(6, 0))
 
+        # Processos
+        ttk.Label(lf_ops, text="Processos:").grid(row=2, column=0, sticky="w", pady=(6, 0))
+        self.processos_var = tk.IntVar(value=os.cpu_count() or 1)
+        ttk.Spinbox(lf_ops, from_=1, to=max(os.cpu_count() or 1, 1), textvariable=self.processos_var,
+                    width=5).grid(row=2, column=1, sticky="w", padx=(6, 12), pady=(6, 0))
+        ttk.Label(lf_ops, text="(1 = sem paralelismo; planilhas pequenas rodam sempre em série)",
+                  foreground="gray").grid(row=2, column=2, columnspan=4, sticky="w", pady=(6, 0))
+
         # Ações
         acts = ttk.Frame(main)
         acts.grid(row=5, column=0, columnspan=3, pady=8)
         self.btn_buscar = ttk.Button(acts, text="🔍 Buscar", command=self.executar_busca)
         self.btn_buscar.pack(side="left", padx=5)
+        self.btn_cancelar = ttk.Button(acts, text="⏹️ Cancelar", command=self.cancelar_busca, state='disabled')
+        self.btn_cancelar.pack(side="left", padx=5)
         ttk.Button(acts, text="🗑️ Limpar", command=self.limpar_campos).pack(side="left", padx=5)
         self.btn_salvar = ttk.Button(acts, text="💾 Salvar Resultados", command=self.salvar_resultados, state='disabled')
         self.btn_salvar.pack(side="left", padx=5)
+        self.agrupar_var = tk.BooleanVar()
+        ttk.Checkbutton(acts, text="Uma linha por linha encontrada", variable=self.agrupar_var).pack(side="left", padx=5)
+        ttk.Button(acts, text="🩺 Diagnóstico", command=self.mostrar_diagnostico).pack(side="left", padx=5)
 
         # Resultados
         lf_res = ttk.LabelFrame(main, text="📊 Resultados", padding=10)
         lf_res.grid(row=6, column=0, columnspan=3, sticky="nsew")
         lf_res.columnconfigure(0, weight=1)
-        lf_res.rowconfigure(0, weight=1)
-
-        self.resultado_text = scrolledtext.ScrolledText(lf_res, height=18, font=('Consolas', 10), wrap="word")
-        self.resultado_text.grid(row=0, column=0, sticky="nsew")
-
-        self.progress = ttk.Progressbar(main, mode='indeterminate')
+        lf_res.rowconfigure(2, weight=1)
+
+        self.resumo_label = ttk.Label(lf_res, text="", wraplength=820, justify="left")
+        self.resumo_label.grid(row=0, column=0, columnspan=2, sticky="w")
+
+        filtros = ttk.Frame(lf_res)
+        filtros.grid(row=1, column=0, columnspan=2, sticky="w", pady=6)
+        ttk.Label(filtros, text="Palavra:").pack(side="left")
+        self.filtro_palavra = ttk.Combobox(filtros, state="readonly", width=24)
+        self.filtro_palavra.pack(side="left", padx=(4, 12))
+        self.filtro_palavra.bind('<<ComboboxSelected>>', self._aplicar_visao)
+        ttk.Label(filtros, text="Coluna:").pack(side="left")
+        self.filtro_coluna = ttk.Combobox(filtros, state="readonly", width=24)
+        self.filtro_coluna.pack(side="left", padx=4)
+        self.filtro_coluna.bind('<<ComboboxSelected>>', self._aplicar_visao)
+
+        self.tabela = ttk.Treeview(lf_res, columns=[c for c, _, _ in COLUNAS_TABELA], show="headings", height=14)
+        for c, titulo, largura in COLUNAS_TABELA:
+            self.tabela.heading(c, text=titulo,
+                                command=(lambda c=c: self._ordenar_por(c)) if c != "conteudo" else "")
+            self.tabela.column(c, width=largura, stretch=(c == "conteudo"), anchor="w")
+        self.tabela.grid(row=2, column=0, sticky="nsew")
+        barra = ttk.Scrollbar(lf_res, orient="vertical", command=self.tabela.yview)
+        barra.grid(row=2, column=1, sticky="ns")
+        self.tabela.configure(yscrollcommand=barra.set)
+
+        paginas = ttk.Frame(lf_res)
+        paginas.grid(row=3, column=0, columnspan=2, pady=(6, 0))
+        self.btn_anterior = ttk.Button(paginas, text="◀", width=3, command=lambda: self._mudar_pagina(-1))
+        self.btn_anterior.pack(side="left")
+        self.pagina_label = ttk.Label(paginas, text="")
+        self.pagina_label.pack(side="left", padx=8)
+        self.btn_proxima = ttk.Button(paginas, text="▶", width=3, command=lambda: self._mudar_pagina(1))
+        self.btn_proxima.pack(side="left")
+        self._mensagem("")
+
+        self.progress = ttk.Progressbar(main, mode='determinate', maximum=100)
         self.progress.grid(row=7, column=0, columnspan=3, sticky="ew", pady=(8, 0))
+        self.progresso_label = ttk.Label(main, text="", foreground="gray")
+        self.progresso_label.grid(row=8, column=0, columnspan=3, sticky="w")
         
     def _on_slider_change(self, v):
         try:
@@ -181,17 +269,46 @@ class ExcelKeywordSearcherGUI:
             return
         self.arquivo_var.set(arq)
         self.arquivo_path = arq
+        self.arquivos_lote = None
         self._carregar_arquivo_info()
 
+    def selecionar_pasta(self):
+        pasta = filedialog.askdirectory(title="Selecionar pasta com arquivos Excel")
+        if not pasta:
+            return
+        from busca_lote import expandir_arquivos
+        arquivos = expandir_arquivos([pasta])
+        if not arquivos:
+            messagebox.showwarning("Aviso", "Nenhum arquivo Excel (.xlsx/.xlsm) encontrado na pasta.")
+            return
+        # Em lote, cada arquivo é aberto na hora da busca.
+        self.arquivo_var.set(pasta)
+        self.arquivo_path = None
+        self.arquivos_lote = arquivos
+        self.planilha = None
+        self.motor.definir_planilha(None)
+        self.aba_combo['values'] = []
+        self.aba_var.set("")
+        self.info_arquivo.config(
+            text=f"📁 {len(arquivos)} arquivo(s) Excel na pasta e subpastas "
+                 f"(primeira aba de cada, ou todas com 'Pesquisar todas as abas')",
+            foreground="green"
+        )
+
     def _carregar_arquivo_info(self):
+        from motor_busca import abrir_excel
         try:
-            excel_file = pd.ExcelFile(self.arquivo_path)
-            self.aba_combo['values'] = excel_file.sheet_names
-            self.aba_combo.set(excel_file.sheet_names[0])
-            self.df = pd.read_excel(self.arquivo_path, sheet_name=excel_file.sheet_names[0], engine="openpyxl")
-            self._clear_caches()
+            # O arquivo só fica aberto para ler os nomes das abas e o cabeçalho da primeira.
+            excel = abrir_excel(self.arquivo_path)
+            try:
+                abas = excel.sheet_names
+                self.aba_combo['values'] = abas
+                self.aba_combo.set(abas[0])
+                self._carregar_aba(abas[0], excel)
+            finally:
+                excel.close()
             self.info_arquivo.config(
-                text=f"✅ {len(excel_file.sheet_names)} aba(s) | {self.df.shape[0]} linhas × {self.df.shape[1]} colunas",
+                text=f"✅ {len(abas)} aba(s) | {self._descrever_aba()}",
                 foreground="green"
             )
         except Exception as e:
@@ -204,16 +321,25 @@ class ExcelKeywordSearcherGUI:
             return
         try:
             nome_aba = self.aba_var.get()
-            self.df = pd.read_excel(self.arquivo_path, sheet_name=nome_aba, engine="openpyxl")
-            self._clear_caches()
+            self._carregar_aba(nome_aba)
             self.info_arquivo.config(
-                text=f"✅ Aba '{nome_aba}': {self.df.shape[0]} linhas × {self.df.shape[1]} colunas",
+                text=f"✅ Aba '{nome_aba}': {self._descrever_aba()}",
                 foreground="green"
             )
         except Exception as e:
             logging.exception("Erro ao carregar aba")
             messagebox.showerror("Erro", f"Erro ao carregar aba:\n{e}")
 
+    def _carregar_aba(self, nome_aba: str, excel: pd.ExcelFile | None = None):
+        # Só o cabeçalho é lido aqui; as colunas são carregadas na busca, conforme forem usadas.
+        from motor_busca import PlanilhaExcel
+        self.planilha = PlanilhaExcel(self.arquivo_path, nome_aba, excel, self.cache)
+        self.motor.definir_planilha(self.planilha)
+
+    def _descrever_aba(self) -> str:
+        linhas = self.planilha.total_linhas
+        return f"{linhas if linhas is not None else '?'} linhas × {len(self.planilha.colunas)} colunas"
+
     # ===================== Colunas específicas =====================
     def toggle_colunas_especificas(self):
         state = 'normal' if self.usar_colunas_especificas.get() else 'disabled'
@@ -223,8 +349,8 @@ class ExcelKeywordSearcherGUI:
             self.colunas_var.set("")
 
     def mostrar_colunas(self):
-        if self.df is None:
-            messagebox.showwarning("Aviso", "Carregue um arquivo Excel primeiro.")
+        if self.planilha is None:
+            messagebox.showwarning("Aviso", "Carregue um arquivo Excel primeiro (em lote, informe as colunas pelo nome).")
             return
 
         popup = tk.Toplevel(self.root)
@@ -244,7 +370,7 @@ class ExcelKeywordSearcherGUI:
         scrollbar.pack(side="right", fill="y")
 
         listbox = tk.Listbox(lista_frame, yscrollcommand=scrollbar.set, font=('Consolas', 10), selectmode="extended")
-        for c in self.df.columns:
+        for c in self.planilha.colunas:
             listbox.insert("end", c)
         listbox.pack(side="left", fill="both", expand=True)
         scrollbar.config(command=listbox.yview)
@@ -259,7 +385,7 @@ class ExcelKeywordSearcherGUI:
                 popup.destroy()
 
         def copiar_todas():
-            self.colunas_var.set(", ".join(self.df.columns.tolist()))
+            self.colunas_var.set(", ".join(map(str, self.planilha.colunas)))
             popup.destroy()
 
         ttk.Button(btns, text="Copiar Selecionadas", command=copiar_sel).pack(side="left", padx=4)
@@ -270,8 +396,8 @@ class ExcelKeywordSearcherGUI:
 
     # ===================== Execução de busca =====================
     def executar_busca(self):
-        if not self.arquivo_path:
-            messagebox.showwarning("Aviso", "Selecione um arquivo Excel.")
+        if not self.arquivo_path and not self.arquivos_lote:
+            messagebox.showwarning("Aviso", "Selecione um arquivo Excel ou uma pasta.")
             return
         palavras_texto = self.palavras_var.get().strip()
         if not palavras_texto:
@@ -285,198 +411,352 @@ class ExcelKeywordSearcherGUI:
 
         self.btn_salvar.config(state='disabled')
         self.btn_buscar.config(state='disabled')
-        self.progress.start()
-        self.resultado_text.delete(1.0, "end")
-        self.resultado_text.insert("end", "🔎 Executando busca...\n")
-
-        t = threading.Thread(target=self._buscar_thread, daemon=True)
+        self.btn_cancelar.config(state='normal')
+        self.progress.config(value=0)
+        self.resultados = None
+        self.ordem = None
+        self._mensagem("🔎 Executando busca...")
+
+        from busca_lote import BuscaLote
+        from motor_busca import ControleBusca
+        diagnostico.limpar()
+        self.controle = ControleBusca()
+        self.lote = None
+        if self.arquivos_lote or self.todas_abas_var.get():
+            self.lote = BuscaLote(self.motor, self.arquivos_lote or [self.arquivo_path],
+                                  todas_abas=self.todas_abas_var.get(), cache=self.cache)
+        self._parciais_exibidas = None
+        self._ultima_parcial = time.perf_counter()
+        t = threading.Thread(target=self._buscar_thread, args=(self.controle, self.lote), daemon=True)
         t.start()
+        self.root.after(INTERVALO_PROGRESSO_MS, self._acompanhar_busca, self.controle)
 
-    def _buscar_thread(self):
+    def _buscar_thread(self, controle: ControleBusca, lote: BuscaLote | None):
+        from motor_busca import BuscaCancelada
         try:
             palavras = [p.strip() for p in self.palavras_var.get().split(",") if p.strip()]
             cols = None
             if self.usar_colunas_especificas.get():
                 cols = [c.strip() for c in self.colunas_var.get().split(",") if c.strip()]
-            self.resultados = self.buscar_palavras_chave(palavras, cols)
-            self.root.after(0, self._finalizar_busca)
+            try:
+                processos = max(int(self.processos_var.get()), 1)
+            except (tk.TclError, ValueError):
+                processos = 1
+            if processos != self.motor.processos:
+                self.motor.encerrar()
+                self.motor.processos = processos
+            with diagnostico.perfilar():
+                if lote is not None:
+                    for _ in lote.executar(palavras, cols, modo=self.modo_busca.get(), limiar=self.limiar_fuzzy.get(),
+                                           controle=controle):
+                        pass
+                    resultados = lote.consolidar()
+                else:
+                    if self.motor.planilha is not self.planilha:
+                        self.motor.definir_planilha(self.planilha)
+                    resultados = self.motor.buscar_palavras_chave(
+                        palavras, cols, modo=self.modo_busca.get(), limiar=self.limiar_fuzzy.get(), controle=controle
+                    )
+            self.root.after(0, lambda: self._finalizar_busca(resultados))
+        except BuscaCancelada:
+            parcial = lote.consolidar() if lote is not None else controle.parcial()
+            self.root.after(0, lambda: self._finalizar_busca(parcial, cancelada=True))
         except Exception as e:
             logging.exception("Erro durante a busca")
-            self.root.after(0, lambda: self._erro_busca(str(e)))
-
-    def _finalizar_busca(self):
-        self.progress.stop()
+            # ``e`` deixa de existir ao sair do except; a lambda roda depois, na thread da interface.
+            msg = str(e)
+            self.root.after(0, lambda: self._erro_busca(msg))
+
+    def cancelar_busca(self):
+        if self.controle is not None:
+            self.controle.cancelar()
+            self.btn_cancelar.config(state='disabled')
+            self.progresso_label.config(text="⏹️ Cancelando...")
+
+    def _acompanhar_busca(self, controle: ControleBusca):
+        # Roda na thread da interface, a cada INTERVALO_PROGRESSO_MS, até a busca terminar.
+        if controle is not self.controle:
+            return
+        lote = self.lote
+        if lote is None:
+            self.progress.config(value=controle.fracao * 100)
+            estado = controle.ocorrencias
+        else:
+            abas = len(lote.planilhas)
+            self.progress.config(value=(lote.processadas + controle.fracao) / abas * 100 if abas else 0)
+            estado = (lote.processadas, controle.ocorrencias)
+        if not controle.cancelado:
+            restante = controle.restante
+            texto = (f"{controle.celulas} de {controle.total_celulas} células (linhas × colunas) • "
+                     f"{controle.ocorrencias} ocorrência(s)"
+                     + (f" • faltam ~{restante:.0f}s" if restante is not None else ""))
+            if lote is not None:
+                texto = (f"Aba {min(lote.processadas + 1, len(lote.planilhas))} de {len(lote.planilhas)}: " + texto
+                         if lote.planilhas else "Abrindo os arquivos...")
+            self.progresso_label.config(text=texto)
+        agora = time.perf_counter()
+        if estado != self._parciais_exibidas and (agora - self._ultima_parcial) * 1000 >= INTERVALO_PARCIAIS_MS:
+            self._parciais_exibidas = estado
+            self._ultima_parcial = agora
+            # Em lote, a parcial é o conjunto das abas já concluídas.
+            self.resultados = controle.parcial() if lote is None else lote.consolidar()
+            self.exibir_resultados(parcial=True)
+        self.root.after(INTERVALO_PROGRESSO_MS, self._acompanhar_busca, controle)
+
+    def _finalizar_busca(self, resultados: ResultadoBusca | None, cancelada: bool = False):
+        self.controle = None
         self.btn_buscar.config(state='normal')
+        self.btn_cancelar.config(state='disabled')
+        self.progresso_label.config(text="⏹️ Busca cancelada: resultados parciais." if cancelada else "")
+        if not cancelada:
+            self.progress.config(value=100)
+        self.resultados = resultados
         self.exibir_resultados()
-        if self.resultados and self.resultados.get('total_ocorrencias', 0) > 0:
+        if self.resultados and self.resultados.total_ocorrencias > 0:
             self.btn_salvar.config(state='normal')
+        if self.resultados is not None and self.resultados.avisos:
+            motivos = "\n".join(f"• {p}: {m}" for p, m in self.resultados.avisos.items())
+            messagebox.showwarning("Padrões ignorados",
+                                   f"Algumas palavras não foram buscadas:\n\n{motivos}\n\n"
+                                   "Revise a expressão regular e tente de novo.")
 
     def _erro_busca(self, erro: str):
-        self.progress.stop()
+        self.controle = None
+        self.progress.config(value=0)
+        self.progresso_label.config(text="")
         self.btn_buscar.config(state='normal')
+        self.btn_cancelar.config(state='disabled')
         messagebox.showerror("Erro na Busca", f"Ocorreu um erro:\n{erro}")
-        self.resultado_text.delete(1.0, "end")
-        self.resultado_text.insert("end", f"❌ Erro na busca: {erro}")
-
-    # ===================== Núcleo de busca =====================
-    def buscar_palavras_chave(self, palavras_chave: List[str], colunas_especificas: List[str] | None = None) -> Dict:
-        if self.df is None or self.df.empty:
-            return {'palavras_encontradas': {}, 'total_ocorrencias': 0, 'resumo': {}}
-
-        modo = self.modo_busca.get()
-        limiar = self.limiar_fuzzy.get()
-        logging.info("Iniciando busca | modo=%s limiar=%s", modo, limiar)
-
-        resultados = {'palavras_encontradas': {}, 'total_ocorrencias': 0, 'resumo': {}}
-
-        colunas_busca = [c for c in (colunas_especificas or self.df.columns.tolist()) if c in self.df.columns]
-
-        need_stem = (modo == "radical")
-        self._prepare_caches(colunas_busca, need_stem=need_stem)
-
-        consultas: list[tuple[str, str]] = []
-        for p in palavras_chave:
-            if not p:
-                continue
-            proc = self.stem_pt(p) if modo == "radical" else self.normalizar_texto(p)
-            consultas.append((p, proc))
-
-        for palavra_original, alvo_proc in consultas:
-            resultados['palavras_encontradas'][palavra_original] = []
-            for c in colunas_busca:
-                base = self.stem_cache[c] if modo == "radical" else self.norm_cache[c]
-                idxs = []
-
-                if modo == "exato":
-                    mask = base.str.contains(re.escape(alvo_proc), na=False)
-                    idxs = base[mask].index
-
-                elif modo == "padrão":
-                    try:
-                        mask = base.str.contains(alvo_proc, na=False, regex=True)
-                    except re.error:
-                        mask = pd.Series(False, index=base.index)
-                    idxs = base[mask].index
-
-                elif modo == "similaridade":
-                    if len(alvo_proc) >= 3:
-                        trig = re.escape(alvo_proc[:3])
-                        pre = base.str.contains(trig, na=False)
-                        cand_idx = base[pre].index
-                    else:
-                        cand_idx = base.index
-
-                    for i in cand_idx:
-                        if fuzz.partial_ratio(alvo_proc, base.at[i]) >= limiar:
-                            idxs.append(i)
-
-                elif modo == "radical":
-                    mask = base.str.contains(re.escape(alvo_proc), na=False)
-                    idxs = base[mask].index
-
-                for i in idxs:
-                    valor_original = self.df.at[i, c]
-                    linha_completa = self.df.loc[i, :].to_dict()
-                    pos = str(valor_original).lower().find(palavra_original.lower())
-                    resultados['palavras_encontradas'][palavra_original].append({
-                        'linha': i + 2,
-                        'coluna': c,
-                        'valor_original': valor_original,
-                        'posicao_encontrada': pos,
-                        'linha_completa': linha_completa
-                    })
-                    resultados['total_ocorrencias'] += 1
-
-        for palavra, ocorr in resultados['palavras_encontradas'].items():
-            resultados['resumo'][palavra] = len(ocorr)
-
-        logging.info("Busca finalizada | ocorrências=%d", resultados['total_ocorrencias'])
-        return resultados
-
-    def _prepare_caches(self, cols: list[str], need_stem: bool):
-        for c in cols:
-            if c not in self.norm_cache:
-                serie = self.df[c].astype(str)
-                self.norm_cache[c] = serie.map(self.normalizar_texto)
-            if need_stem and c not in self.stem_cache:
-                serie = self.df[c].astype(str)
-                self.stem_cache[c] = serie.map(self.stem_pt)
-
-    def _clear_caches(self):
-        self.norm_cache.clear()
-        self.stem_cache.clear()
+        self._mensagem(f"❌ Erro na busca: {erro}")
 
     # ===================== Exibir/Salvar =====================
-    def exibir_resultados(self):
-        self.resultado_text.delete(1.0, "end")
-        if not self.resultados or self.resultados.get('total_ocorrencias', 0) == 0:
-            self.resultado_text.insert("end", "❌ Nenhuma palavra-chave foi encontrada.\n")
-            self.resultado_text.insert("end", "\nTente:\n• Palavras mais simples\n• Modo 'similaridade' ou 'radical'\n• Ajustar o limiar de similaridade\n")
+    def exibir_resultados(self, parcial: bool = False):
+        # Filtros, ordenação e (nas atualizações parciais) a página atual são mantidos.
+        if parcial and not self.resultados:
+            return
+        if not self.resultados or self.resultados.total_ocorrencias == 0:
+            self._mensagem("❌ Nenhuma palavra-chave foi encontrada.\n"
+                           "Tente: palavras mais simples • modo 'similaridade' ou 'radical' • "
+                           "ajustar o limiar de similaridade")
             return
 
-        self.resultado_text.insert("end", "=" * 64 + "\n")
-        self.resultado_text.insert("end", "📊 RESULTADOS DA BUSCA\n")
-        self.resultado_text.insert("end", "=" * 64 + "\n\n")
-        self.resultado_text.insert("end", f"✅ Total de ocorrências: {self.resultados['total_ocorrencias']}\n\n")
-
-        self.resultado_text.insert("end", "📋 Resumo por palavra:\n")
-        for palavra, qtd in self.resultados['resumo'].items():
-            if qtd > 0:
-                self.resultado_text.insert("end", f"   • '{palavra}': {qtd}\n")
-
-        self.resultado_text.insert("end", "\n📍 Detalhes:\n")
-        for palavra, ocorr in self.resultados['palavras_encontradas'].items():
-            if not ocorr:
-                continue
-            self.resultado_text.insert("end", f"\n🔎 Palavra: '{palavra}'\n" + "-" * 40 + "\n")
-            for i, item in enumerate(ocorr, 1):
+        resumo = " • ".join(f"'{p}': {n}" for p, n in self.resultados.resumo.items() if n > 0)
+        self.resumo_label.config(text=f"{'⏳ Até agora' if parcial else '✅ Total de ocorrências'}: "
+                                      f"{self.resultados.total_ocorrencias}\n📋 Por palavra: {resumo}")
+        from busca_lote import ResultadoLote
+        lote = isinstance(self.resultados, ResultadoLote)
+        if parcial and lote:
+            # As abas concluídas já liberaram as colunas; montar a página agora as traria de volta
+            # na thread da interface. Em lote, a tabela só é preenchida ao fim da busca.
+            return
+        for combo, valores in ((self.filtro_palavra, self.resultados.palavras),
+                               (self.filtro_coluna, [str(c) for c in self.resultados.colunas])):
+            valores = ["(todas)"] + valores
+            if list(combo['values']) != valores:
+                combo['values'] = valores
+                combo.current(0)
+        self.tabela.configure(displaycolumns=[c for c, _, _ in COLUNAS_TABELA if lote or c != "origem"])
+        self._aplicar_visao(manter_pagina=True)
+
+    def _aplicar_visao(self, _evt=None, manter_pagina: bool = False):
+        # Filtro e ordenação trabalham sobre os arrays do resultado; a busca não é refeita.
+        if not self.resultados or (self.lote is not None and self.controle is not None):
+            return
+        p = self.filtro_palavra.current()
+        c = self.filtro_coluna.current()
+        self.visao = self.resultados.filtrar(
+            palavras=[self.resultados.palavras[p - 1]] if p > 0 else None,
+            colunas=[self.resultados.colunas[c - 1]] if c > 0 else None,
+        )
+        if self.ordem:
+            self.visao = self.visao.ordenar(*self.ordem)
+        for col, titulo, _ in COLUNAS_TABELA:
+            seta = ""
+            if self.ordem and self.ordem[0] == col:
+                seta = " ▼" if self.ordem[1] else " ▲"
+            self.tabela.heading(col, text=titulo + seta)
+        if not manter_pagina:
+            self.pagina = 0
+        self._mostrar_pagina()
+
+    def _ordenar_por(self, coluna: str):
+        if not self.resultados:
+            return
+        decrescente = bool(self.ordem and self.ordem[0] == coluna and not self.ordem[1])
+        self.ordem = (coluna, decrescente)
+        self._aplicar_visao()
+
+    def _mudar_pagina(self, delta: int):
+        self.pagina += delta
+        self._mostrar_pagina()
+
+    def _mostrar_pagina(self):
+        inicio = time.perf_counter()
+        linhas = self._preencher_tabela()
+        diagnostico.registrar("tabela", time.perf_counter() - inicio, linhas=linhas)
+        if self.janela_diagnostico is not None and self.controle is None:
+            self._atualizar_diagnostico()
+
+    def _preencher_tabela(self) -> int:
+        self.tabela.delete(*self.tabela.get_children())
+        total = len(self.visao) if self.visao is not None else 0
+        paginas = max(-(-total // TAMANHO_PAGINA), 1)
+        self.pagina = min(max(self.pagina, 0), paginas - 1)
+        inicio = self.pagina * TAMANHO_PAGINA
+        if total:
+            # Só o conteúdo das ocorrências desta página é lido da planilha.
+            for item in self.visao.selecionar(slice(inicio, inicio + TAMANHO_PAGINA)).ocorrencias():
                 conteudo = str(item['valor_original'])
-                if len(conteudo) > 140:
-                    conteudo = conteudo[:140] + "..."
-                self.resultado_text.insert("end", f"   {i}. Linha {item['linha']}, Coluna '{item['coluna']}'\n")
-                self.resultado_text.insert("end", f"      Conteúdo: {conteudo}\n")
+                if len(conteudo) > 300:
+                    conteudo = conteudo[:300] + "..."
+                origem = f"{os.path.basename(item['arquivo'])} [{item['aba']}]" if 'arquivo' in item else ""
+                self.tabela.insert("", "end", values=(origem, item['palavra'], item['linha'], item['coluna'],
+                                                      f"{item['nota']:.0f}", conteudo.replace("\n", " ")))
+        self.pagina_label.config(
+            text=f"Página {self.pagina + 1} de {paginas} ({total} ocorrência(s))" if total else "")
+        self.btn_anterior.config(state='normal' if self.pagina > 0 else 'disabled')
+        self.btn_proxima.config(state='normal' if self.pagina < paginas - 1 else 'disabled')
+        return min(max(total - inicio, 0), TAMANHO_PAGINA)
+
+    def _mensagem(self, texto: str):
+        self.visao = None
+        self.resumo_label.config(text=texto)
+        self.filtro_palavra.set("")
+        self.filtro_coluna.set("")
+        self.filtro_palavra['values'] = []
+        self.filtro_coluna['values'] = []
+        self._mostrar_pagina()
 
     def salvar_resultados(self):
-        if not self.resultados or self.resultados.get('total_ocorrencias', 0) == 0:
+        if not self.resultados or self.resultados.total_ocorrencias == 0:
             messagebox.showwarning("Aviso", "Não há resultados para salvar.")
             return
 
+        from busca_lote import ResultadoLote, colunas_lote, registros_lote
+        from motor_busca import (EscritorRegistros, colunas_registros, parquet_disponivel, registros_agrupados,
+                                 registros_em_blocos)
+
+        # Parquet só aparece como opção quando o pyarrow está instalado.
+        tipos = [("Arquivos Excel", "*.xlsx"), ("Arquivos CSV", "*.csv")]
+        if parquet_disponivel():
+            tipos.append(("Arquivos Parquet", "*.parquet"))
         saida = filedialog.asksaveasfilename(
             title="Salvar resultados",
             defaultextension=".xlsx",
-            filetypes=[("Arquivos Excel", "*.xlsx"), ("Todos os arquivos", "*.*")]
+            filetypes=tipos + [("Todos os arquivos", "*.*")]
         )
         if not saida:
             return
 
         try:
-            registros = []
-            for palavra, ocorr in self.resultados['palavras_encontradas'].items():
-                for item in ocorr:
-                    base = {
-                        'PALAVRA_BUSCADA': palavra,
-                        'LINHA_ENCONTRADA': item['linha'],
-                        'COLUNA_ENCONTRADA': item['coluna'],
-                        'CONTEUDO_ENCONTRADO': item['valor_original']
-                    }
-                    for nome_coluna, valor in item['linha_completa'].items():
-                        base[f'ORIGINAL_{nome_coluna}'] = valor
-                    registros.append(base)
-
-            df_out = pd.DataFrame(registros)
-            cols_first = ['PALAVRA_BUSCADA', 'LINHA_ENCONTRADA', 'COLUNA_ENCONTRADA', 'CONTEUDO_ENCONTRADO']
-            cols_orig = sorted([c for c in df_out.columns if c.startswith("ORIGINAL_")])
-            df_out = df_out[cols_first + cols_orig]
-            df_out.to_excel(saida, index=False)
+            agrupar = self.agrupar_var.get()
+            if isinstance(self.resultados, ResultadoLote):
+                colunas = colunas_lote(self.resultados, agrupado=agrupar)
+                registros = registros_lote(self.resultados, agrupado=agrupar)
+            else:
+                colunas = colunas_registros(self.resultados.planilha.colunas, agrupado=agrupar)
+                registros = (registros_agrupados if agrupar else registros_em_blocos)(self.resultados)
+            with EscritorRegistros(saida, colunas) as escritor:
+                linhas = escritor.escrever(registros)
 
             messagebox.showinfo(
                 "Sucesso",
-                f"✅ Resultados salvos\n\nArquivo: {saida}\nLinhas: {len(df_out)}\nColunas totais: {len(df_out.columns)}"
+                f"✅ Resultados salvos\n\nArquivo: {saida}\nLinhas: {linhas}\nColunas totais: {len(colunas)}"
             )
         except Exception as e:
             logging.exception("Erro ao salvar")
             messagebox.showerror("Erro", f"Erro ao salvar arquivo:\n{e}")
 
+    # ===================== Diagnóstico =====================
+    def mostrar_diagnostico(self):
+        if self.janela_diagnostico is not None:
+            self.janela_diagnostico.lift()
+            self._atualizar_diagnostico()
+            return
+
+        popup = self.janela_diagnostico = tk.Toplevel(self.root)
+        popup.title("Diagnóstico da última busca")
+        popup.geometry("720x560")
+        popup.protocol("WM_DELETE_WINDOW", self._fechar_diagnostico)
+
+        frame = ttk.Frame(popup, padding=10)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text="Tempo por fase (fases podem conter outras; na busca paralela, somado entre processos)",
+                  foreground="gray").pack(anchor="w")
+
+        self.tabela_fases = ttk.Treeview(frame, columns=("fase", "segundos", "chamadas", "linhas", "vazao"),
+                                         show="headings", height=10)
+        for col, titulo, largura in (("fase", "Fase", 180), ("segundos", "Tempo (s)", 100), ("chamadas", "Chamadas", 110),
+                                     ("linhas", "Linhas", 110), ("vazao", "Linhas/s", 110)):
+            self.tabela_fases.heading(col, text=titulo)
+            self.tabela_fases.column(col, width=largura, anchor="w" if col == "fase" else "e")
+        self.tabela_fases.pack(fill="x", pady=(4, 8))
+
+        self.tabela_caches = ttk.Treeview(frame, columns=("cache", "acertos", "falhas", "taxa"), show="headings", height=5)
+        for col, titulo, largura in (("cache", "Cache", 180), ("acertos", "Acertos", 110), ("falhas", "Falhas", 110),
+                                     ("taxa", "Taxa de acerto", 120)):
+            self.tabela_caches.heading(col, text=titulo)
+            self.tabela_caches.column(col, width=largura, anchor="w" if col == "cache" else "e")
+        self.tabela_caches.pack(fill="x", pady=(0, 8))
+
+        perfil = ttk.Frame(frame)
+        perfil.pack(fill="x")
+        self.perfil_var = tk.BooleanVar(value=diagnostico.perfil_ativo)
+        self.ferramenta_var = tk.StringVar(value=diagnostico.ferramenta_perfil)
+        ttk.Checkbutton(perfil, text="Gravar perfil das buscas com", variable=self.perfil_var,
+                        command=self._configurar_perfil).pack(side="left")
+        combo = ttk.Combobox(perfil, textvariable=self.ferramenta_var, values=FERRAMENTAS_PERFIL, state="readonly", width=14)
+        combo.pack(side="left", padx=6)
+        combo.bind("<<ComboboxSelected>>", self._configurar_perfil)
+
+        self.texto_perfil = tk.Text(frame, height=10, font=('Consolas', 9), wrap="none")
+        self.texto_perfil.pack(fill="both", expand=True, pady=(6, 0))
+
+        btns = ttk.Frame(frame)
+        btns.pack(fill="x", pady=(8, 0))
+        ttk.Button(btns, text="Atualizar", command=self._atualizar_diagnostico).pack(side="left", padx=4)
+        ttk.Button(btns, text="Limpar", command=lambda: (diagnostico.limpar(), self._atualizar_diagnostico())
+                   ).pack(side="left", padx=4)
+        ttk.Button(btns, text="Exportar JSON", command=self._exportar_diagnostico).pack(side="left", padx=4)
+        ttk.Button(btns, text="Fechar", command=self._fechar_diagnostico).pack(side="right")
+        self._atualizar_diagnostico()
+
+    def _configurar_perfil(self, _evt=None):
+        diagnostico.perfil_ativo = self.perfil_var.get()
+        diagnostico.ferramenta_perfil = self.ferramenta_var.get()
+
+    def _atualizar_diagnostico(self):
+        relatorio = diagnostico.relatorio()
+        self.tabela_fases.delete(*self.tabela_fases.get_children())
+        for fase, m in relatorio["fases"].items():
+            self.tabela_fases.insert("", "end", values=(fase, f"{m['segundos']:.3f}", m["chamadas"], m["linhas"],
+                                                        m["linhas_por_segundo"] or ""))
+        self.tabela_caches.delete(*self.tabela_caches.get_children())
+        for nome, m in relatorio["caches"].items():
+            taxa = f"{m['taxa_acerto']:.0%}" if m["taxa_acerto"] is not None else ""
+            self.tabela_caches.insert("", "end", values=(nome, m["acertos"], m["falhas"], taxa))
+        self.texto_perfil.delete("1.0", "end")
+        self.texto_perfil.insert("1.0", relatorio["perfil"] or "(sem perfil: marque a opção acima e refaça a busca)")
+
+    def _exportar_diagnostico(self):
+        saida = filedialog.asksaveasfilename(title="Exportar diagnóstico", defaultextension=".json",
+                                             filetypes=[("JSON", "*.json"), ("Todos os arquivos", "*.*")])
+        if not saida:
+            return
+        try:
+            relatorio = diagnostico.relatorio()
+            relatorio["busca"] = {"modo": self.modo_busca.get(), "limiar": self.limiar_fuzzy.get(),
+                                  "palavras": self.palavras_var.get(), "arquivo": self.arquivo_path}
+            with open(saida, "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.exception("Erro ao exportar diagnóstico")
+            messagebox.showerror("Erro", f"Erro ao exportar diagnóstico:\n{e}")
+
+    def _fechar_diagnostico(self):
+        self.janela_diagnostico.destroy()
+        self.janela_diagnostico = None
+
     # ===================== Miscelânea =====================
     def limpar_campos(self):
         self.arquivo_var.set("")
@@ -484,26 +764,31 @@ class ExcelKeywordSearcherGUI:
         self.colunas_var.set("")
         self.usar_colunas_especificas.set(False)
         self.toggle_colunas_especificas()
-        self.resultado_text.delete(1.0, "end")
         self.btn_salvar.config(state='disabled')
         self.info_arquivo.config(text="Nenhum arquivo selecionado", foreground='gray')
         self.aba_combo['values'] = []
         self.aba_var.set("")
-        self.df = None
+        self.planilha = None
         self.arquivo_path = None
+        self.arquivos_lote = None
+        self.todas_abas_var.set(False)
         self.resultados = None
-        self._clear_caches()
+        self._mensagem("")
+        self.motor.definir_planilha(None)
 
-    def _ensure_nltk(self):
+    def _abrir_cache(self) -> CachePersistente | None:
         try:
-            nltk.data.find('stemmers/rslp')
-        except LookupError:
-            logging.info("Componente 'rslp' do NLTK não encontrado. Baixando agora...")
-            nltk.download('rslp')
-            logging.info("Download do 'rslp' concluído.")
+            return CachePersistente()
+        except OSError:
+            logging.exception("Cache em disco indisponível; seguindo sem cache")
+            return None
 
     def executar(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self._motor is not None:
+                self._motor.encerrar()
 
 
 def main():
@@ -516,4 +801,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
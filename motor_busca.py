@@ -0,0 +1,1678 @@
+"""Núcleo de busca de palavras-chave, independente da interface gráfica."""
+import csv
+import importlib.util
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+import regex
+from pandas.io.parsers import TextParser
+from rapidfuzz import fuzz, process
+
+from cache_persistente import CachePersistente
+from diagnostico import diagnostico
+
+MODOS_BUSCA = ["exato", "padrão", "similaridade", "radical"]
+
+_RE_TOKEN = re.compile(r"\w+")
+
+# Marcas combinantes (acentos soltos após a decomposição NFD); o ``regex`` remove todas numa só passada.
+_RE_MARCAS = regex.compile(r"\p{Mn}+")
+
+# Quantos tokens distintos guardar na memória de radicais (tokens -> radical RSLP).
+MAX_MEMO_RADICAIS = 200_000
+
+# Muda quando o formato/conteúdo das entradas do cache em disco deixa de ser compatível.
+VERSAO_CACHE = 3
+
+# Abaixo disso a busca paralela não compensa o custo de subir os processos e copiar os dados.
+MIN_CELULAS_PARALELO = 200_000
+MIN_LINHAS_FRAGMENTO = 20_000
+
+# Cancelamento: laços longos conferem o pedido a cada bloco de valores; o modo paralelo e o modo
+# "padrão" (em que um só valor pode demorar), a cada intervalo (s).
+BLOCO_VERIFICACAO = 10_000
+INTERVALO_VERIFICACAO = 0.2
+
+# Linhas guardadas, somando todas as entradas, no cache de consultas de cada motor.
+MAX_LINHAS_CONSULTAS = 5_000_000
+
+# Modo "padrão": regex compiladas guardadas e tempo máximo (s) para testar um padrão em um único texto
+# e, somando todos os textos, em uma busca.
+MAX_PADROES_COMPILADOS = 256
+TEMPO_MAXIMO_PADRAO = 2.0
+TEMPO_TOTAL_PADRAO = 30.0
+
+# Regras do stemmer RSLP distribuídas com o programa (relativo à pasta do programa).
+DIRETORIO_NLTK_DATA = os.path.join("dados", "nltk_data")
+
+# Bigramas: com trigramas o limite abaixo quase nunca poda nada nos limiares usuais (75-90).
+Q_GRAMA = 2
+
+
+def diretorio_nltk_data() -> str:
+    """``dados/nltk_data`` ao lado do programa (ou dentro do executável do PyInstaller)."""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, DIRETORIO_NLTK_DATA)
+
+
+def carregar_rslp():
+    """Stemmer RSLP com as regras locais; nunca baixa nada (as máquinas podem estar sem rede)."""
+    import nltk
+    from nltk.stem import RSLPStemmer
+
+    local = diretorio_nltk_data()
+    if local not in nltk.data.path:
+        nltk.data.path.insert(0, local)
+    try:
+        nltk.data.find('stemmers/rslp')
+    except LookupError:
+        raise RuntimeError(
+            "Regras do stemmer RSLP (modo radical) não encontradas. Numa máquina com internet, rode uma vez "
+            f"'python -m nltk.downloader -d {DIRETORIO_NLTK_DATA} rslp' na pasta do programa (ou defina NLTK_DATA)."
+        ) from None
+    return RSLPStemmer()
+
+
+def pontuar_similaridade(alvos: list[str], valores, limiar: float, workers: int = -1) -> np.ndarray:
+    """Matriz (palavras × valores) de ``fuzz.partial_ratio``; notas abaixo do limiar viram 0."""
+    if not len(alvos) or not len(valores):
+        return np.zeros((len(alvos), len(valores)))
+    return process.cdist(alvos, valores, scorer=fuzz.partial_ratio, score_cutoff=limiar,
+                         dtype=np.float64, workers=workers)
+
+
+@lru_cache(maxsize=MAX_PADROES_COMPILADOS)
+def compilar_padrao(padrao: str) -> regex.Pattern:
+    """Regex do modo "padrão", compilada uma vez só (levanta ``regex.error`` se for inválida)."""
+    return regex.compile(padrao)
+
+
+@lru_cache(maxsize=1024)
+def minimo_qgramas_comuns(tamanho: int, limiar: float, q: int = Q_GRAMA) -> int:
+    """Menor número de q-gramas da palavra que qualquer texto com ``partial_ratio >= limiar`` contém.
+
+    ``partial_ratio`` compara a palavra (tamanho L) com janelas de até L caracteres do texto,
+    com nota ``100 * (1 - d / (L + m))``, onde d = remoções + inserções no alinhamento.
+    Cada remoção destrói no máximo q q-gramas da palavra e cada inserção no máximo q - 1;
+    o pior caso entre as janelas que ainda atingem o limiar dá o limite.
+    """
+    total = tamanho - q + 1
+    if total <= 0:
+        return 0
+    pior = 0
+    for comuns in range(tamanho + 1):
+        remocoes = tamanho - comuns
+        for m in range(max(comuns, 1), tamanho + 1):
+            insercoes = m - comuns
+            if 100 * (1 - (remocoes + insercoes) / (tamanho + m)) >= limiar - 1e-9:
+                pior = max(pior, remocoes * q + insercoes * (q - 1))
+    return max(total - pior, 0)
+
+
+class IndiceQGramas:
+    """Índice q-grama -> valores distintos de uma coluna, usado para podar a busca por similaridade.
+
+    Os q-gramas são codificados como inteiros (code points em blocos de 21 bits) e as listas de
+    postagens ficam num único vetor ordenado, no formato CSR, montado só com operações NumPy.
+    Os valores são codificados em blocos; entre eles, ``controle`` pode cancelar a montagem.
+    """
+
+    def __init__(self, valores: np.ndarray, q: int = Q_GRAMA, controle: "ControleBusca | None" = None):
+        self.q = q
+        self.tamanhos = np.fromiter(map(len, valores), dtype=np.int64, count=len(valores))
+        blocos_gramas, blocos_ids = [], []
+        for inicio in range(0, len(valores), BLOCO_VERIFICACAO * 10):
+            if controle is not None:
+                controle.verificar()
+            fim = min(inicio + BLOCO_VERIFICACAO * 10, len(valores))
+            tamanhos = self.tamanhos[inicio:fim]
+            codigos = self._codificar("".join(valores[inicio:fim]))
+            ids = np.repeat(np.arange(inicio, fim), tamanhos)
+            inicio_valor = np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+            validos = np.flatnonzero(np.arange(len(ids)) - inicio_valor <= np.repeat(tamanhos - q, tamanhos))
+            blocos_gramas.append(codigos[validos])
+            blocos_ids.append(ids[validos])
+        gramas = np.concatenate(blocos_gramas) if blocos_gramas else np.empty(0, dtype=np.uint64)
+        ids = np.concatenate(blocos_ids) if blocos_ids else np.empty(0, dtype=np.int64)
+        if controle is not None:
+            controle.verificar()
+
+        bits_id = max(int(len(valores)).bit_length(), 1)
+        if 21 * q + bits_id <= 64:
+            # Ordenar uma única chave (q-grama, id) é bem mais rápido que np.lexsort.
+            chaves = np.sort((gramas << np.uint64(bits_id)) | ids.astype(np.uint64))
+            chaves = chaves[np.r_[True, chaves[1:] != chaves[:-1]]] if len(chaves) else chaves
+            gramas, self.ids = chaves >> np.uint64(bits_id), (chaves & np.uint64((1 << bits_id) - 1)).astype(np.int64)
+        else:
+            ordem = np.lexsort((ids, gramas))
+            gramas, ids = gramas[ordem], ids[ordem]
+            novos = np.ones(len(gramas), dtype=bool)
+            novos[1:] = (gramas[1:] != gramas[:-1]) | (ids[1:] != ids[:-1])
+            gramas, self.ids = gramas[novos], ids[novos]
+
+        inicio_grama = np.flatnonzero(np.r_[True, gramas[1:] != gramas[:-1]]) if len(gramas) else np.empty(0, dtype=np.int64)
+        self.gramas = gramas[inicio_grama]
+        self.limites = np.r_[inicio_grama, len(gramas)]
+
+    def _codificar(self, texto: str) -> np.ndarray:
+        # Código de cada q-grama que começa em cada posição do texto (as últimas q - 1 ficam incompletas).
+        pontos = np.frombuffer(texto.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        n = max(len(pontos) - self.q + 1, 0)
+        codigos = np.zeros(len(pontos), dtype=np.uint64)
+        for j in range(self.q):
+            codigos[:n] = (codigos[:n] << np.uint64(21)) | pontos[j:j + n]
+        return codigos
+
+    def candidatos(self, alvo: str, limiar: float) -> np.ndarray | None:
+        """Valores que podem atingir o limiar; ``None`` quando o limite não poda nada."""
+        minimo = minimo_qgramas_comuns(len(alvo), limiar, self.q)
+        if minimo <= 0:
+            return None
+        contagem = np.zeros(len(self.tamanhos), dtype=np.int32)
+        gramas = self._codificar(alvo)[:len(alvo) - self.q + 1]
+        posicoes = np.searchsorted(self.gramas, gramas)
+        for g, j in zip(gramas, posicoes):
+            if j < len(self.gramas) and self.gramas[j] == g:
+                contagem[self.ids[self.limites[j]:self.limites[j + 1]]] += 1
+        # Textos não mais longos que a palavra viram a agulha do partial_ratio: o limite não vale.
+        return np.flatnonzero((contagem >= minimo) | (self.tamanhos <= len(alvo)))
+
+
+class IndiceInvertido:
+    """Índice token -> valores distintos de cada coluna, montado sobre o texto já processado.
+
+    As consultas mantêm a semântica de substring do ``str.contains``: cada token da
+    consulta é comparado com o vocabulário (igual, prefixo, sufixo ou trecho, conforme
+    esteja delimitado na consulta), os valores candidatos são intersectados e só eles
+    são conferidos por inteiro.
+    """
+
+    def __init__(self):
+        self.colunas: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.postagens: dict[str, dict[str, list[int]]] = {}
+        self.vocabulario: dict[str, list[str]] = {}
+
+    def __contains__(self, coluna: str) -> bool:
+        return coluna in self.colunas
+
+    def adicionar_coluna(self, coluna: str, base: pd.Series, controle: "ControleBusca | None" = None):
+        codigos, valores = pd.factorize(base.to_numpy())
+        vocabulario = []
+        postagens: dict[str, list[int]] = {}
+        for id_valor, texto in enumerate(valores):
+            if controle is not None and id_valor % BLOCO_VERIFICACAO == 0:
+                controle.verificar()
+            for tok in set(_RE_TOKEN.findall(texto)):
+                lista = postagens.get(tok)
+                if lista is None:
+                    lista = postagens[tok] = []
+                    vocabulario.append(tok)
+                lista.append(id_valor)
+        # Só entra no índice completa: um cancelamento no meio não deixa a coluna pela metade.
+        for tok, lista in postagens.items():
+            self.postagens.setdefault(tok, {})[coluna] = lista
+        self.vocabulario[coluna] = vocabulario
+        self.colunas[coluna] = (codigos, valores)
+
+    def candidatos(self, alvos: list[str], colunas: list[str]) -> dict[str, list[np.ndarray | None]]:
+        """Por coluna e alvo, ids dos valores que podem contê-lo (``None`` quando não há como filtrar)."""
+        termos = [[(m.group(), m.start() > 0, m.end() < len(alvo)) for m in _RE_TOKEN.finditer(alvo)]
+                  for alvo in alvos]
+        compativeis = self._vocabulario_compativel({t for ts in termos for t in ts}, colunas)
+        resultado = {}
+        for c in colunas:
+            resultado[c] = []
+            for ts in termos:
+                ids = None
+                for termo in ts:
+                    listas = [self.postagens[v][c] for v in compativeis[termo] if c in self.postagens[v]]
+                    achados = np.unique(np.concatenate(listas)) if listas else np.empty(0, dtype=np.int64)
+                    ids = achados if ids is None else np.intersect1d(ids, achados, assume_unique=True)
+                resultado[c].append(ids)
+        return resultado
+
+    def _vocabulario_compativel(self, termos: set[tuple[str, bool, bool]], colunas: list[str]) -> dict[tuple, list[str]]:
+        # Tokens do vocabulário compatíveis com cada token da consulta: igual quando delimitado dos
+        # dois lados na consulta, prefixo/sufixo quando só de um, trecho quando de nenhum.
+        # Só o vocabulário das colunas pedidas é varrido, uma única vez para todos os termos.
+        compativeis: dict[tuple, list[str]] = {t: [] for t in termos}
+        soltos = [t for t in termos if not (t[1] and t[2])]
+        for t in termos:
+            if t[1] and t[2] and t[0] in self.postagens:
+                compativeis[t].append(t[0])
+        if not soltos:
+            return compativeis
+        automato = AutomatoPalavras([tok for tok, _, _ in soltos])
+        vocabulario = self.vocabulario[colunas[0]] if len(colunas) == 1 else \
+            dict.fromkeys(v for c in colunas for v in self.vocabulario[c])
+        for v in vocabulario:
+            for k in automato.varrer(v):
+                tok, fixo_inicio, fixo_fim = soltos[k]
+                if (not fixo_inicio or v.startswith(tok)) and (not fixo_fim or v.endswith(tok)):
+                    compativeis[soltos[k]].append(v)
+        return compativeis
+
+
+def _padrao_trie(palavras: list[str]) -> str:
+    # Regex em forma de árvore de prefixos: em cada posição o motor segue um único ramo e,
+    # como o final de palavra vira um grupo opcional guloso, prefere sempre a mais longa.
+    trie: dict = {}
+    for p in palavras:
+        no = trie
+        for ch in p:
+            no = no.setdefault(ch, {})
+        no[""] = {}
+
+    def montar(no: dict) -> str:
+        partes = ""
+        while len(no) == 1 and "" not in no:
+            ch, no = next(iter(no.items()))
+            partes += re.escape(ch)
+        ramos = [re.escape(ch) + montar(filho) for ch, filho in sorted(no.items()) if ch]
+        if not ramos:
+            return partes
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        return partes + (f"(?:{corpo})?" if "" in no else corpo)
+
+    return montar(trie)
+
+
+class AutomatoPalavras:
+    """Casa várias palavras numa única varredura de cada texto, informando onde cada uma aparece.
+
+    Um lookahead com a regex em árvore acha, em cada posição, a palavra mais longa que começa
+    ali; as outras que casam na mesma posição são exatamente os prefixos dela que também são
+    palavras, pré-calculados em ``prefixos``. O resultado é o mesmo de um Aho-Corasick.
+    """
+
+    def __init__(self, palavras: list[str]):
+        self.ids_por_texto: dict[str, list[int]] = {}
+        for k, p in enumerate(palavras):
+            self.ids_por_texto.setdefault(p, []).append(k)
+        self.vazias = self.ids_por_texto.pop("", [])
+        distintas = list(self.ids_por_texto)
+        self.prefixos = {p: [q for q in distintas if q != p and p.startswith(q)] for p in distintas}
+        self.padrao = re.compile(f"(?=({_padrao_trie(distintas)}))") if distintas else None
+
+    def varrer(self, texto: str) -> dict[int, int]:
+        """Mapeia o índice de cada palavra encontrada para a posição da primeira ocorrência."""
+        achados = dict.fromkeys(self.vazias, 0)
+        if self.padrao is None:
+            return achados
+        for m in self.padrao.finditer(texto):
+            p = m.group(1)
+            for q in (p, *self.prefixos[p]):
+                for k in self.ids_por_texto[q]:
+                    achados.setdefault(k, m.start())
+        return achados
+
+
+# ===================== Planilhas =====================
+class Planilha:
+    """Planilha já carregada em memória."""
+
+    def __init__(self, df: pd.DataFrame, chave: str | None = None):
+        self._dados = df
+        self.colunas: list = df.columns.tolist()
+        self.chave = chave
+        # Identifica o conteúdo para o cache de consultas; sem ela, as consultas não são guardadas.
+        self.impressao = chave
+
+    @property
+    def total_linhas(self) -> int | None:
+        return len(self._dados)
+
+    def carregar(self, colunas: list | None = None, controle: "ControleBusca | None" = None) -> pd.DataFrame:
+        """Colunas pedidas (todas, sem ``colunas``); ``controle`` permite cancelar uma leitura demorada."""
+        return self._dados if colunas is None else self._dados[list(colunas)]
+
+
+def _converter_celula(cell):
+    # Mesma conversão do leitor openpyxl do pandas, para que o resultado seja idêntico ao read_excel.
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+
+def _largura_linha(row) -> int:
+    # Células até a última com valor (o read_excel descarta as vazias do fim de cada linha).
+    n = len(row)
+    while n and (row[n - 1].value is None or row[n - 1].value == ""):
+        n -= 1
+    return n
+
+
+def _dimensao_aba(ws, medir: bool = True) -> tuple[int | None, int]:
+    """Linhas e largura declaradas na aba; sem dimensão declarada, medidas percorrendo a aba
+    (ou, sem ``medir``, ``(None, 0)``).
+
+    A dimensão precisa ser lida antes de qualquer leitura (que a reinicia). Ela pode ser maior que
+    a área com dados (células só formatadas) ou, em arquivos gerados por outros programas, menor.
+    Arquivos gravados em modo write-only (como as exportações deste programa) não a declaram.
+    """
+    linhas, largura = ws.max_row, ws.max_column
+    ws.reset_dimensions()
+    if linhas is None or largura is None:
+        if not medir:
+            return None, 0
+        linhas = largura = 0
+        for n, row in enumerate(ws.rows, 1):
+            tamanho = _largura_linha(row)
+            if tamanho:
+                linhas, largura = n, max(largura, tamanho)
+    return linhas, largura
+
+
+def _cabecalho_excel(ws) -> list:
+    for row in ws.iter_rows(max_row=1):
+        return [_converter_celula(cel) for cel in row[:_largura_linha(row)]]
+    return []
+
+
+def _nomes_colunas(cabecalho: list, largura: int) -> list:
+    """Nomes das colunas como no read_excel: células vazias e colunas além do cabeçalho viram
+    ``Unnamed: n`` e nomes repetidos ganham ``.1``, ``.2``..."""
+    if not largura:
+        return []
+    linha = list(cabecalho) + [""] * (largura - len(cabecalho))
+    return TextParser([linha], header=0, skip_blank_lines=False).read().columns.tolist()
+
+
+class PlanilhaExcel(Planilha):
+    """Aba de um arquivo Excel lida sob demanda.
+
+    Na abertura só os nomes das abas e o cabeçalho são lidos. Cada busca carrega apenas as colunas
+    que usa, numa leitura em streaming (openpyxl read-only) que guarda em memória só essas colunas;
+    colunas já lidas ficam em memória e, havendo ``cache``, também em disco.
+
+    Como no read_excel, a aba tem a largura da linha mais larga, não só a do cabeçalho. Na abertura
+    ela vem do cache em disco, se já foi conferida, ou da dimensão declarada no arquivo (medida
+    percorrendo a aba quando não há dimensão); a primeira leitura confere a largura real e corrige
+    ``colunas`` se preciso (colunas vazias somem, colunas além da dimensão entram). A dimensão
+    conferida vai para o cache, e as próximas aberturas leem só o cabeçalho.
+
+    O arquivo não fica aberto: ``excel``, se passado, só é usado para ler o cabeçalho (e continua
+    com quem o abriu); cada leitura de colunas abre e fecha o arquivo de novo.
+    """
+
+    def __init__(self, caminho: str, aba: str, excel: pd.ExcelFile | None = None,
+                 cache: CachePersistente | None = None):
+        self.caminho = caminho
+        self.aba = aba
+        self.cache = cache
+        self.chave = cache.chave_planilha(caminho, aba) if cache is not None else None
+        if self.chave is not None:
+            self.impressao = self.chave
+        else:
+            st = os.stat(caminho)
+            self.impressao = f"{os.path.abspath(caminho)}|{st.st_size}|{st.st_mtime_ns}|{aba!r}"
+        # (linhas de dados, largura) já conferidas numa leitura anterior; poupam medir a aba.
+        self._dimensao = self.cache.obter(self._chave_dimensao()) if self.chave is not None else None
+        aberto = excel if excel is not None else abrir_excel(caminho)
+        try:
+            ws = aberto.book[aba]
+            if self._dimensao is None:
+                declarada = ws.max_row is not None and ws.max_column is not None
+                linhas, largura = _dimensao_aba(ws)
+            else:
+                ws.reset_dimensions()
+            self._cabecalho = _cabecalho_excel(ws)
+        finally:
+            if excel is None:
+                aberto.close()
+        self._series: dict = {}
+        if self._dimensao is not None:
+            self._estimativa_linhas, largura = self._dimensao
+        else:
+            self._estimativa_linhas = linhas - 1 if linhas else None
+            largura = max(len(self._cabecalho), largura)
+            if not declarada:
+                self._conferir_dimensao(self._estimativa_linhas or 0, largura)
+        self.colunas = _nomes_colunas(self._cabecalho, largura)
+
+    @property
+    def total_linhas(self) -> int | None:
+        if self._series:
+            return len(next(iter(self._series.values())))
+        return self._estimativa_linhas
+
+    def carregar(self, colunas: list | None = None, controle: "ControleBusca | None" = None) -> pd.DataFrame:
+        faltando = self.carregar_do_cache(self.colunas if colunas is None else colunas)
+        if faltando:
+            self.adicionar_colunas(*self._ler_colunas(faltando, controle))
+        # Depois da leitura: a largura pode ter sido corrigida.
+        colunas = self.colunas if colunas is None else [c for c in colunas if c in self.colunas]
+        if not colunas:
+            return pd.DataFrame(index=pd.RangeIndex(self.total_linhas or 0))
+        return pd.concat([self._series[c] for c in colunas], axis=1)
+
+    def _chave_coluna(self, c) -> str:
+        return f"v{VERSAO_CACHE}|{self.chave}|coluna|{c!r}"
+
+    def _chave_dimensao(self) -> str:
+        return f"v{VERSAO_CACHE}|{self.chave}|dimensao"
+
+    def _conferir_dimensao(self, linhas: int, largura: int):
+        # Guarda a dimensão medida de verdade (não a declarada, que pode estar errada).
+        if self._dimensao != (linhas, largura):
+            self._dimensao = (linhas, largura)
+            if self.cache is not None and self.chave is not None:
+                self.cache.guardar(self._chave_dimensao(), self._dimensao)
+
+    def carregar_do_cache(self, colunas: list) -> list:
+        """Traz para a memória as colunas que estão no cache em disco; retorna as que ainda faltam."""
+        faltando = []
+        for c in dict.fromkeys(colunas):
+            if c in self._series:
+                continue
+            serie = self.cache.obter(self._chave_coluna(c)) if self.cache is not None else None
+            if serie is None:
+                faltando.append(c)
+            else:
+                self._series[c] = serie
+        return faltando
+
+    def adicionar_colunas(self, series: dict, largura: int | None = None):
+        """Guarda colunas lidas por fora (p.ex. em outro processo) na memória e no cache em disco;
+        ``largura`` é a largura real da aba, conferida nessa leitura."""
+        if largura is not None:
+            if largura != len(self.colunas):
+                self.colunas = _nomes_colunas(self._cabecalho, largura)
+            linhas = len(next(iter(series.values()))) if series else self._estimativa_linhas
+            self._conferir_dimensao(linhas or 0, largura)
+        for c, serie in series.items():
+            self._series[c] = serie
+            if self.cache is not None:
+                self.cache.guardar(self._chave_coluna(c), serie)
+
+    def liberar(self):
+        """Descarta as colunas em memória; voltam do cache em disco (ou do arquivo) quando pedidas."""
+        self._series.clear()
+
+    def _ler_colunas(self, restantes: list, controle: "ControleBusca | None" = None) -> tuple[dict, int]:
+        return ler_colunas_excel(self.caminho, self.aba, self._cabecalho, len(self.colunas), restantes, controle)
+
+
+def ler_colunas_excel(caminho: str, aba: str, cabecalho: list, conhecida: int, restantes: list,
+                      controle: "ControleBusca | None" = None) -> tuple[dict, int]:
+    """Lê colunas de uma aba numa passada; retorna as colunas e a largura real da aba.
+
+    ``conhecida`` é a largura que a aba tinha até aqui, com os nomes de ``_nomes_colunas``. Colunas
+    além dela também são lidas; as pedidas que ficarem além da largura real (vazias) não voltam.
+    Com ``controle``, a leitura pode ser cancelada a cada bloco de linhas.
+    """
+    inicio = time.perf_counter()
+    colunas = _nomes_colunas(cabecalho, conhecida)
+    posicoes = [colunas.index(c) for c in restantes]
+    linhas: list[list] = []
+    largura = ultima_com_dados = 0
+    excel = abrir_excel(caminho)
+    try:
+        ws = excel.book[aba]
+        ws.reset_dimensions()
+        for n, row in enumerate(ws.rows):
+            if controle is not None and n % BLOCO_VERIFICACAO == 0:
+                controle.verificar()
+            tamanho = _largura_linha(row)
+            largura = max(largura, tamanho)
+            if n == 0:
+                continue
+            valores = [_converter_celula(row[p]) if p < len(row) else "" for p in posicoes]
+            if tamanho > conhecida:
+                valores.extend(_converter_celula(row[p]) for p in range(conhecida, tamanho))
+            linhas.append(valores)
+            if tamanho:
+                ultima_com_dados = len(linhas)
+    finally:
+        excel.close()
+    del linhas[ultima_com_dados:]
+
+    total = len(posicoes) + max(largura - conhecida, 0)
+    if total > len(posicoes):
+        linhas = [valores + [""] * (total - len(valores)) for valores in linhas]
+    df = TextParser([list(range(total))] + linhas, header=0, skip_blank_lines=False).read()
+    nomes = _nomes_colunas(cabecalho, largura)
+    lidas = {c: df[pos].rename(c) for pos, c in enumerate(restantes) if posicoes[pos] < largura}
+    for pos, c in enumerate(nomes[conhecida:], len(posicoes)):
+        lidas[c] = df[pos].rename(c)
+    diagnostico.registrar("ler_planilha", time.perf_counter() - inicio, linhas=len(df))
+    return lidas, largura
+
+
+# ===================== Resultados =====================
+class ResultadoBusca:
+    """Ocorrências de uma busca em arrays paralelos, uma posição por ocorrência.
+
+    Guarda só ids e números: ``palavra`` (posição em ``palavras``), ``indice`` (linha da planilha),
+    ``coluna`` (posição em ``colunas``), ``posicao`` do trecho no valor (-1 quando o modo não a
+    calcula; é procurada ao materializar) e ``nota`` (similaridade; 100 nos demais modos).
+    O conteúdo das células e as linhas completas são lidos da planilha só quando pedidos,
+    uma vez por linha distinta.
+    """
+
+    def __init__(self, planilha: Planilha | None, palavras: list[str], colunas: list,
+                 palavra=(), indice=(), coluna=(), posicao=(), nota=()):
+        self.planilha = planilha
+        self.palavras = list(palavras)
+        self.colunas = list(colunas)
+        self.palavra = np.asarray(palavra, dtype=np.int32)
+        self.indice = np.asarray(indice, dtype=np.int64)
+        self.coluna = np.asarray(coluna, dtype=np.int32)
+        self.posicao = np.asarray(posicao, dtype=np.int64)
+        self.nota = np.asarray(nota, dtype=np.float32)
+        self._valores: np.ndarray | None = None
+        self._linhas: dict | None = None
+        # Palavras que não puderam ser buscadas (padrão inválido ou lento demais) -> motivo.
+        self.avisos: dict[str, str] = {}
+
+    @classmethod
+    def de_partes(cls, planilha: Planilha | None, palavras: list[str], colunas: list,
+                  partes: list[tuple]) -> "ResultadoBusca":
+        """Junta pedaços (palavra, indice, coluna, posicao, nota) na ordem (palavra, linha, coluna)."""
+        if not partes:
+            return cls(planilha, palavras, colunas)
+        palavra, indice, coluna, posicao, nota = (np.concatenate(a) for a in zip(*partes))
+        ordem = np.lexsort((coluna, indice, palavra))
+        return cls(planilha, palavras, colunas, palavra[ordem], indice[ordem], coluna[ordem],
+                   posicao[ordem], nota[ordem])
+
+    def __len__(self) -> int:
+        return len(self.indice)
+
+    @property
+    def total_ocorrencias(self) -> int:
+        return len(self.indice)
+
+    @property
+    def resumo(self) -> dict[str, int]:
+        contagem = np.bincount(self.palavra, minlength=len(self.palavras))
+        return {p: int(n) for p, n in zip(self.palavras, contagem)}
+
+    def selecionar(self, selecao) -> "ResultadoBusca":
+        """Subconjunto (máscara booleana ou posições), sem reler a planilha."""
+        sub = ResultadoBusca(self.planilha, self.palavras, self.colunas, self.palavra[selecao],
+                             self.indice[selecao], self.coluna[selecao], self.posicao[selecao], self.nota[selecao])
+        if self._valores is not None:
+            sub._valores = self._valores[selecao]
+        sub._linhas = self._linhas
+        sub.avisos = self.avisos
+        return sub
+
+    def filtrar(self, palavras: list[str] | None = None, colunas: list | None = None) -> "ResultadoBusca":
+        mascara = np.ones(len(self.indice), dtype=bool)
+        if palavras is not None:
+            mascara &= np.isin(self.palavra, [self.palavras.index(p) for p in palavras])
+        if colunas is not None:
+            mascara &= np.isin(self.coluna, [self.colunas.index(c) for c in colunas])
+        return self.selecionar(mascara)
+
+    def ordenar(self, por: str, decrescente: bool = False) -> "ResultadoBusca":
+        """Ordena por ``palavra``, ``linha``, ``coluna`` ou ``nota``; empates seguem (palavra, linha, coluna)."""
+        chave = self._chaves_ordenacao()[por]
+        if decrescente:
+            chave = -chave.astype(np.float64)
+        return self.selecionar(np.lexsort((*self._desempate(), chave)))
+
+    def _chaves_ordenacao(self) -> dict[str, np.ndarray]:
+        return {'palavra': self.palavra, 'linha': self.indice, 'coluna': self.coluna, 'nota': self.nota}
+
+    def _desempate(self) -> tuple:
+        # Chaves do np.lexsort, da menos para a mais significativa.
+        return self.coluna, self.indice, self.palavra
+
+    def valores(self) -> np.ndarray:
+        """Conteúdo da célula de cada ocorrência (lido uma vez por coluna e guardado)."""
+        if self._valores is None:
+            with diagnostico.medir("materializar", linhas=len(self.indice)):
+                valores = np.empty(len(self.indice), dtype=object)
+                for ci in np.unique(self.coluna):
+                    mascara = self.coluna == ci
+                    c = self.colunas[ci]
+                    valores[mascara] = self.planilha.carregar([c])[c].loc[self.indice[mascara]].to_numpy()
+            self._valores = valores
+        return self._valores
+
+    def linhas_completas(self) -> dict:
+        """{indice: {coluna: valor}} das linhas com ocorrências, lidas da planilha uma vez só."""
+        if self._linhas is None:
+            self._linhas = {}
+        faltando = np.setdiff1d(self.indice, np.fromiter(self._linhas, dtype=np.int64, count=len(self._linhas)))
+        if len(faltando):
+            with diagnostico.medir("materializar", linhas=len(faltando)):
+                self._linhas.update(self.planilha.carregar().loc[faltando].to_dict("index"))
+        return self._linhas
+
+    def ocorrencias(self) -> Iterator[dict]:
+        """Cada ocorrência como dicionário, criado só quando é consumido."""
+        valores = self.valores()
+        for n in range(len(self.indice)):
+            palavra = self.palavras[self.palavra[n]]
+            i = int(self.indice[n])
+            pos = int(self.posicao[n])
+            if pos < 0:
+                pos = str(valores[n]).lower().find(palavra.lower())
+            yield {
+                'palavra': palavra,
+                'indice': i,
+                'linha': i + 2,
+                'coluna': self.colunas[self.coluna[n]],
+                'valor_original': valores[n],
+                'posicao_encontrada': pos,
+                'nota': float(self.nota[n]),
+            }
+
+
+# ===================== Cache de consultas =====================
+class CacheConsultas:
+    """Linhas encontradas por (planilha, coluna, modo, palavra processada), em memória e com descarte LRU.
+
+    Refazer uma busca só calcula as palavras que ainda não estão aqui. No modo similaridade a entrada
+    guarda as notas a partir do limiar com que foi calculada, e serve para qualquer limiar maior ou igual.
+    """
+
+    def __init__(self, limite_linhas: int = MAX_LINHAS_CONSULTAS):
+        self.limite_linhas = limite_linhas
+        self._entradas: OrderedDict = OrderedDict()
+        self._linhas = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obter(self, chave: tuple, limiar: int = 0) -> tuple | None:
+        entrada = self._entradas.get(chave)
+        if entrada is None or entrada[0] > limiar:
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada[1:]
+
+    def guardar(self, chave: tuple, limiar: int, indice: np.ndarray, posicao: np.ndarray | None,
+                nota: np.ndarray | None):
+        self._remover(chave)
+        self._entradas[chave] = (limiar, indice, posicao, nota)
+        self._linhas += len(indice) + 1
+        while self._linhas > self.limite_linhas and len(self._entradas) > 1:
+            self._remover(next(iter(self._entradas)))
+
+    def limpar(self):
+        self._entradas.clear()
+        self._linhas = 0
+
+    def _remover(self, chave: tuple):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self._linhas -= len(entrada[1]) + 1
+
+
+# ===================== Progresso/Cancelamento =====================
+class BuscaCancelada(Exception):
+    """A busca foi interrompida por ``ControleBusca.cancelar``."""
+
+
+class ControleBusca:
+    """Progresso e cancelamento de uma busca em andamento, compartilhados com outra thread.
+
+    O motor chama ``avancar`` a cada coluna (ou fragmento, no modo paralelo) concluída, com as
+    ocorrências encontradas nela, e ``verificar`` dentro dos laços longos. Quem acompanha lê os
+    contadores e ``parcial()`` e pode pedir ``cancelar()``.
+    """
+
+    def __init__(self):
+        self.total_celulas = 0
+        self.celulas = 0
+        self.ocorrencias = 0
+        self.inicio = time.perf_counter()
+        self._cancelado = threading.Event()
+        self._partes: list[tuple] = []
+        self._contexto: tuple | None = None
+
+    def iniciar(self, planilha: Planilha, palavras: list[str], colunas: list, total_celulas: int):
+        # Chamado no começo de cada busca: um mesmo controle pode acompanhar várias (p.ex. um lote).
+        self._contexto = (planilha, palavras, colunas)
+        self._partes = []
+        self.total_celulas = total_celulas
+        self.celulas = 0
+        self.ocorrencias = 0
+        self.inicio = time.perf_counter()
+
+    def avancar(self, celulas: int, partes: list[tuple] = ()):
+        self._partes.extend(partes)
+        self.ocorrencias += sum(len(parte[1]) for parte in partes)
+        self.celulas += celulas
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    def verificar(self):
+        if self._cancelado.is_set():
+            raise BuscaCancelada()
+
+    @property
+    def fracao(self) -> float:
+        return min(self.celulas / self.total_celulas, 1.0) if self.total_celulas else 0.0
+
+    @property
+    def restante(self) -> float | None:
+        """Segundos estimados até o fim, pelo ritmo até agora (``None`` antes da primeira coluna)."""
+        fracao = self.fracao
+        if not fracao:
+            return None
+        return (time.perf_counter() - self.inicio) * (1 - fracao) / fracao
+
+    def parcial(self) -> ResultadoBusca | None:
+        """Ocorrências encontradas até agora, na mesma ordem do resultado final."""
+        if self._contexto is None:
+            return None
+        return ResultadoBusca.de_partes(*self._contexto, list(self._partes))
+
+
+class MotorBusca:
+    def __init__(self, planilha: Planilha | pd.DataFrame | None = None, cache: CachePersistente | None = None,
+                 processos: int | None = None):
+        # ---- Estado ----
+        self.planilha: Planilha | None = None
+        self.cache = cache
+        self.norm_cache: dict[str, pd.Series] = {}
+        self.stem_cache: dict[str, pd.Series] = {}
+        self.distintos: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.indice_qgramas: dict[str, IndiceQGramas] = {}
+        self.indice_norm = IndiceInvertido()
+        self.indice_stem = IndiceInvertido()
+
+        # ---- Consultas já feitas, reaproveitadas entre buscas e entre planilhas ----
+        self.consultas = CacheConsultas()
+
+        # ---- Modo "padrão": limites de tempo e palavras ignoradas na busca atual ----
+        self.tempo_max_padrao = TEMPO_MAXIMO_PADRAO
+        self.tempo_total_padrao = TEMPO_TOTAL_PADRAO
+        self._avisos: dict[str, str] = {}
+        self._padroes_testados: dict[str, dict[str, bool]] = {}
+        self._tempo_padroes: dict[str, float] = {}
+
+        # ---- Stemmer (criado só quando o modo "radical" é usado) ----
+        self._stemmer = None
+        self._radical = None
+
+        # ---- Paralelismo: processos para a busca, threads para o rapidfuzz ----
+        self.processos = processos if processos is not None else (os.cpu_count() or 1)
+        self.threads_rapidfuzz = -1
+        self._executor: ProcessPoolExecutor | None = None
+        self._controle: ControleBusca | None = None
+        # Coluna em busca no modo serial: [linhas, células já informadas], e a etapa em curso, como
+        # fração (início, fim) do trabalho na coluna; o progresso é informado também dentro dela.
+        self._coluna: list[int] | None = None
+        self._etapa = (0.0, 1.0)
+
+        self.definir_planilha(planilha)
+
+    @property
+    def stemmer(self):
+        # O import do nltk é adiado: o pacote carrega tkinter e vários módulos pesados.
+        if self._stemmer is None:
+            self._stemmer = carregar_rslp()
+        return self._stemmer
+
+    def _radicais(self):
+        # Planilhas repetem as mesmas palavras milhões de vezes: cada token é reduzido uma vez só.
+        if self._radical is None:
+            self._radical = lru_cache(maxsize=MAX_MEMO_RADICAIS)(self.stemmer.stem)
+        return self._radical
+
+    def definir_planilha(self, planilha: Planilha | pd.DataFrame | None):
+        self.planilha = Planilha(planilha) if isinstance(planilha, pd.DataFrame) else planilha
+        self._clear_caches()
+
+    # ===================== Utilidades de texto =====================
+    def normalizar_texto(self, texto: str) -> str:
+        if not isinstance(texto, str):
+            texto = str(texto)
+        if texto.isascii():
+            return texto.lower()
+        return _RE_MARCAS.sub('', unicodedata.normalize('NFD', texto)).lower()
+
+    def stem_pt(self, s: str) -> str:
+        tokens = _RE_TOKEN.findall(self.normalizar_texto(s))
+        return " ".join(map(self._radicais(), tokens))
+
+    # ===================== Núcleo de busca =====================
+    def buscar_palavras_chave(self, palavras_chave: List[str], colunas_especificas: List[str] | None = None,
+                              modo: str = "similaridade", limiar: int = 80,
+                              controle: ControleBusca | None = None) -> ResultadoBusca:
+        """Busca as palavras nas colunas; com ``controle``, informa o progresso e pode ser cancelada
+        (levanta ``BuscaCancelada``)."""
+        if modo not in MODOS_BUSCA:
+            raise ValueError(f"Modo de busca inválido: {modo!r}")
+        palavras = [p for p in dict.fromkeys(palavras_chave) if p]
+        if self.planilha is None or not self.planilha.colunas:
+            return ResultadoBusca(self.planilha, palavras, [])
+
+        colunas_busca = self._colunas_busca(colunas_especificas)
+        df = self.planilha.carregar(colunas_busca, controle)
+        # A primeira leitura de uma PlanilhaExcel pode corrigir a largura da aba (e as colunas).
+        if self._colunas_busca(colunas_especificas) != colunas_busca:
+            colunas_busca = self._colunas_busca(colunas_especificas)
+            df = self.planilha.carregar(colunas_busca, controle)
+        if df.empty:
+            return ResultadoBusca(self.planilha, palavras, colunas_busca)
+
+        logging.info("Iniciando busca | modo=%s limiar=%s", modo, limiar)
+        inicio = time.perf_counter()
+        if controle is not None:
+            controle.iniciar(self.planilha, palavras, colunas_busca, len(df) * len(colunas_busca))
+
+        self._controle = controle
+        self._avisos, self._padroes_testados, self._tempo_padroes = {}, {}, {}
+        try:
+            alvos = [self.stem_pt(p) if modo == "radical" else self.normalizar_texto(p) for p in palavras]
+            base_limiar = self._limiar_base(modo, limiar)
+            achados = {c: self._consultas_guardadas(c, alvos, modo, base_limiar) for c in colunas_busca}
+            pendentes = [c for c in colunas_busca if any(a is None for a in achados[c])]
+            if self._usar_paralelo(df, pendentes, modo):
+                partes = self._buscar_paralelo(df, colunas_busca, palavras, alvos, achados, modo, limiar, base_limiar)
+            else:
+                partes = self._buscar_serial(df, colunas_busca, alvos, achados, modo, limiar, base_limiar)
+        finally:
+            self._controle = self._coluna = None
+            self._padroes_testados, self._tempo_padroes = {}, {}
+
+        # Palavras ignoradas não deixam ocorrências parciais (de outras colunas ou fragmentos).
+        ignoradas = [k for k, alvo in enumerate(alvos) if alvo in self._avisos]
+        if ignoradas:
+            partes = [tuple(a[~np.isin(parte[0], ignoradas)] for a in parte) for parte in partes]
+        # Ordem determinística (palavra, linha, coluna), igual nos modos serial e paralelo.
+        with diagnostico.medir("montar_resultado", linhas=sum(len(parte[0]) for parte in partes)):
+            resultado = ResultadoBusca.de_partes(self.planilha, palavras, colunas_busca, partes)
+        resultado.avisos = {palavras[k]: self._avisos[alvos[k]] for k in ignoradas}
+        diagnostico.registrar("busca", time.perf_counter() - inicio, linhas=len(df) * len(colunas_busca))
+        logging.info("Busca finalizada | ocorrências=%d", resultado.total_ocorrencias)
+        return resultado
+
+    def _colunas_busca(self, colunas_especificas: List[str] | None) -> list:
+        return [c for c in (colunas_especificas or self.planilha.colunas) if c in self.planilha.colunas]
+
+    # ===================== Cache de consultas =====================
+    def _limiar_base(self, modo: str, limiar: int) -> int:
+        # Limiar com que as notas são calculadas e guardadas: o pedido, para que a poda por q-gramas
+        # valha. Subir o limiar depois só refiltra; baixá-lo abaixo do guardado recalcula a palavra.
+        # Os demais modos não dependem dele.
+        return limiar if modo == "similaridade" else 0
+
+    def _consultas_guardadas(self, c: str, alvos: list[str], modo: str, base_limiar: int) -> list[tuple | None]:
+        impressao = self.planilha.impressao
+        if impressao is None:
+            return [None] * len(alvos)
+        achados = [self.consultas.obter((impressao, c, modo, alvo), base_limiar) for alvo in alvos]
+        acertos = sum(a is not None for a in achados)
+        diagnostico.cache("consultas", acertos, len(achados) - acertos)
+        return achados
+
+    def _guardar_consulta(self, c: str, alvo: str, modo: str, base_limiar: int, achado: tuple):
+        if self.planilha.impressao is not None:
+            self.consultas.guardar((self.planilha.impressao, c, modo, alvo), base_limiar, *achado)
+
+    # ===================== Busca por coluna =====================
+    def _buscar_serial(self, df: pd.DataFrame, colunas_busca: list, alvos: list[str], achados: dict, modo: str,
+                       limiar: int, base_limiar: int) -> list[tuple]:
+        # Coluna a coluna: prepara o texto processado e busca nela as palavras que não estão no cache.
+        need_stem = (modo == "radical")
+        partes = []
+        for ci, c in enumerate(colunas_busca):
+            self._verificar()
+            achados_coluna = achados[c]
+            faltando = [k for k, achado in enumerate(achados_coluna) if achado is None]
+            self._coluna, self._etapa = [len(df), 0], (0.0, 1.0)
+            if faltando:
+                self._prepare_caches([c], need_stem=need_stem, need_index=modo in ("exato", "radical"))
+                novos = self._buscar_coluna(c, [alvos[k] for k in faltando], modo, base_limiar)
+                for k, achado in zip(faltando, novos):
+                    achados_coluna[k] = achado
+                    if achado is not None:
+                        self._guardar_consulta(c, alvos[k], modo, base_limiar, achado)
+            partes_coluna = _montar_partes(ci, achados_coluna, modo, limiar)
+            partes.extend(partes_coluna)
+            if self._controle is not None:
+                self._controle.avancar(len(df) - self._coluna[1], partes_coluna)
+            self._coluna = None
+        return partes
+
+    def _avancar_coluna(self, fracao: float):
+        # Informa o avanço dentro da coluna atual: ``fracao`` da etapa em curso, convertida em células.
+        if self._controle is None or self._coluna is None:
+            return
+        inicio, fim = self._etapa
+        celulas = int(self._coluna[0] * min(inicio + (fim - inicio) * fracao, 1.0))
+        if celulas > self._coluna[1]:
+            self._controle.avancar(celulas - self._coluna[1])
+            self._coluna[1] = celulas
+
+    def _buscar_coluna(self, c: str, alvos: list[str], modo: str, limiar: int) -> list[tuple]:
+        # Para cada palavra: índices das linhas, posições (só no modo exato) e notas (só na similaridade);
+        # None para os padrões ignorados.
+        base = self.stem_cache[c] if modo == "radical" else self.norm_cache[c]
+        rotulos = base.index.to_numpy()
+        if modo in ("exato", "radical"):
+            indice = self.indice_stem if modo == "radical" else self.indice_norm
+            codigos, _ = indice.colunas[c]
+            automato = AutomatoPalavras(alvos)
+            with diagnostico.medir("candidatos", chamadas=len(alvos)):
+                candidatos = indice.candidatos(alvos, [c])[c]
+            ocorrencias = self._ocorrencias(indice, c, candidatos, automato)
+        elif modo == "similaridade":
+            codigos, valores = self._fatorar(c)
+            similares = self._similares(c, alvos, limiar)
+
+        achados = []
+        for k, alvo_proc in enumerate(alvos):
+            posicoes = notas = None
+
+            if modo in ("exato", "radical"):
+                por_valor = ocorrencias[k]
+                linhas = np.flatnonzero(por_valor[codigos] >= 0)
+                if modo == "exato":
+                    posicoes = por_valor[codigos[linhas]]
+
+            elif modo == "padrão":
+                self._etapa = (k / len(alvos), (k + 1) / len(alvos))
+                linhas = self._casar_padrao(c, alvo_proc)
+                if linhas is None:
+                    achados.append(None)
+                    continue
+
+            elif modo == "similaridade":
+                ids, notas_ids = similares[k]
+                nota_valor = np.zeros(len(valores), dtype=np.float32)
+                nota_valor[ids] = notas_ids
+                linhas = np.flatnonzero(np.isin(codigos, ids))
+                notas = nota_valor[codigos[linhas]]
+
+            achados.append((rotulos[linhas], posicoes, notas))
+        return achados
+
+    def _casar_padrao(self, c: str, padrao: str) -> np.ndarray | None:
+        # Linhas cuja coluna casa a regex. Cada valor distinto é testado uma vez só na busca, mesmo
+        # que se repita em outras colunas; padrão inválido ou lento demais vira aviso (None). O tempo
+        # gasto com o padrão soma entre colunas: cada texto recebe no máximo o que resta do total.
+        if padrao in self._avisos:
+            return None
+        try:
+            buscar = compilar_padrao(padrao).search
+        except regex.error as e:
+            self._avisos[padrao] = f"padrão inválido: {e}"
+            return None
+        codigos, valores = self._fatorar(c)
+        testados = self._padroes_testados.setdefault(padrao, {})
+        casou = np.zeros(len(valores), dtype=bool)
+        inicio_fase, testes = time.perf_counter(), len(testados)
+        gasto = self._tempo_padroes.get(padrao, 0.0)
+        prazo = inicio_fase + self.tempo_total_padrao - gasto
+        proxima_verificacao = inicio_fase
+        tempo = self.tempo_max_padrao
+        try:
+            for n, v in enumerate(valores):
+                r = testados.get(v)
+                if r is None:
+                    agora = time.perf_counter()
+                    if agora >= proxima_verificacao:
+                        self._verificar()
+                        self._avancar_coluna(n / len(valores))
+                        proxima_verificacao = agora + INTERVALO_VERIFICACAO
+                    tempo = min(self.tempo_max_padrao, prazo - agora)
+                    if tempo <= 0:
+                        raise TimeoutError()
+                    r = testados[v] = buscar(v, timeout=tempo) is not None
+                casou[n] = r
+        except TimeoutError:
+            if tempo < self.tempo_max_padrao:
+                self._avisos[padrao] = (f"padrão lento demais (mais de {self.tempo_total_padrao:g} s "
+                                        "somando os textos testados)")
+            else:
+                self._avisos[padrao] = f"padrão lento demais (mais de {self.tempo_max_padrao:g} s num único texto)"
+            return None
+        finally:
+            fim = time.perf_counter()
+            self._tempo_padroes[padrao] = gasto + fim - inicio_fase
+            diagnostico.registrar("padrão", fim - inicio_fase, len(testados) - testes, len(codigos))
+        return np.flatnonzero(casou[codigos])
+
+    def _verificar(self):
+        if self._controle is not None:
+            self._controle.verificar()
+
+    # ===================== Execução paralela =====================
+    def _usar_paralelo(self, df: pd.DataFrame, colunas_busca: list, modo: str) -> bool:
+        # Planilhas pequenas, ou cujas colunas já estão preparadas (em memória ou no cache em disco),
+        # ficam no modo serial.
+        if self.processos <= 1 or len(df) * len(colunas_busca) < MIN_CELULAS_PARALELO:
+            return False
+        tipo, cache = ("stem", self.stem_cache) if modo == "radical" else ("norm", self.norm_cache)
+        for c in colunas_busca:
+            if c not in cache:
+                serie = self._processada_em_disco(tipo, c)
+                if serie is not None:
+                    cache[c] = serie
+        return any(c not in cache for c in colunas_busca)
+
+    def _buscar_paralelo(self, df: pd.DataFrame, colunas_busca: list, palavras: list[str], alvos: list[str],
+                         achados: dict, modo: str, limiar: int, base_limiar: int) -> list[tuple]:
+        # Divide a planilha em fragmentos (coluna × faixa de linhas) e busca cada um num processo,
+        # só com as palavras que faltam no cache de consultas para aquela coluna. Os fragmentos
+        # voltam também processados, para que a coluna fique pronta (em memória e em disco).
+        fatias = max(1, min(self.processos, len(df) // MIN_LINHAS_FRAGMENTO))
+        tamanho = -(-len(df) // fatias)
+        partes = []
+        futuros = {}
+        recebidos: dict[int, list] = {}
+        processadas: dict[int, dict[int, tuple]] = {}
+        for ci, c in enumerate(colunas_busca):
+            faltando = [k for k, achado in enumerate(achados[c]) if achado is None]
+            partes_coluna = _montar_partes(ci, achados[c], modo, limiar)
+            partes.extend(partes_coluna)
+            if not faltando:
+                if self._controle is not None:
+                    self._controle.avancar(len(df), partes_coluna)
+                continue
+            if self._controle is not None:
+                self._controle.avancar(0, partes_coluna)
+            recebidos[ci] = []
+            processadas[ci] = {}
+            for ini in range(0, len(df), tamanho):
+                fragmento = df[c].iloc[ini:ini + tamanho]
+                futuro = self.pool().submit(_buscar_fragmento, fragmento, [palavras[k] for k in faltando], modo,
+                                            base_limiar)
+                futuros[futuro] = (ci, ini, np.asarray(faltando), len(fragmento))
+
+        pendentes = set(futuros)
+        try:
+            while pendentes:
+                prontos, pendentes = wait(pendentes, timeout=INTERVALO_VERIFICACAO, return_when=FIRST_COMPLETED)
+                self._verificar()
+                for futuro in prontos:
+                    ci, ini, faltando, linhas = futuros[futuro]
+                    palavra, indice, posicao, nota, avisos, processadas[ci][ini], medicoes = futuro.result()
+                    diagnostico.somar(medicoes)
+                    palavra = faltando[palavra]
+                    for k in faltando:
+                        if palavras[k] in avisos:
+                            self._avisos.setdefault(alvos[k], avisos[palavras[k]])
+                    recebidos[ci].append((palavra, indice, posicao, nota))
+                    sel = nota >= limiar
+                    parte = (palavra[sel], indice[sel], np.full(int(sel.sum()), ci), posicao[sel], nota[sel])
+                    partes.append(parte)
+                    if self._controle is not None:
+                        self._controle.avancar(linhas, [parte])
+        except BaseException:
+            for futuro in pendentes:
+                futuro.cancel()
+            raise
+
+        # Com a coluna completa, o texto processado vai para os caches da coluna e as linhas de cada
+        # palavra, para o cache de consultas.
+        for ci, pedacos in recebidos.items():
+            c = colunas_busca[ci]
+            fragmentos = [processadas[ci][ini] for ini in sorted(processadas[ci])]
+            for tipo, cache, series in zip(("norm", "stem"), (self.norm_cache, self.stem_cache), zip(*fragmentos)):
+                if c not in cache and all(serie is not None for serie in series):
+                    cache[c] = pd.concat(series)
+                    self._guardar_processada(tipo, c, cache[c])
+            palavra, indice, posicao, nota = (np.concatenate(x) for x in zip(*pedacos))
+            for k in (k for k, achado in enumerate(achados[c]) if achado is None):
+                if alvos[k] in self._avisos:
+                    continue
+                sel = palavra == k
+                self._guardar_consulta(c, alvos[k], modo, base_limiar,
+                                       (indice[sel], posicao[sel] if modo == "exato" else None,
+                                        nota[sel] if modo == "similaridade" else None))
+        return partes
+
+    def pool(self) -> ProcessPoolExecutor:
+        """Pool de processos do motor, criado no primeiro uso e compartilhado com a busca em lote."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processos, initializer=_iniciar_trabalhador)
+        return self._executor
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.sincronizar()
+
+    def buscar_em_fluxo(self, blocos: Iterable[pd.DataFrame], palavras_chave: List[str],
+                        colunas_especificas: List[str] | None = None, modo: str = "similaridade",
+                        limiar: int = 80) -> Iterator[dict]:
+        """Busca bloco a bloco (ver ``ler_blocos``), gerando cada ocorrência assim que é encontrada.
+
+        A memória fica limitada ao tamanho do bloco. Cada ocorrência traz também ``linha_completa``,
+        compartilhada entre as ocorrências da mesma linha. A planilha atual do motor é substituída
+        pelos blocos durante a busca.
+        """
+        try:
+            for bloco in blocos:
+                self.definir_planilha(bloco)
+                resultado = self.buscar_palavras_chave(palavras_chave, colunas_especificas, modo, limiar)
+                linhas = resultado.linhas_completas()
+                for item in resultado.ocorrencias():
+                    yield {**item, 'linha_completa': linhas[item['indice']]}
+        finally:
+            self.definir_planilha(None)
+
+    def _prepare_caches(self, cols: list[str], need_stem: bool, need_index: bool = False):
+        prontas = sum(c in (self.stem_cache if need_stem else self.norm_cache) for c in cols)
+        diagnostico.cache("texto_em_memoria", prontas, len(cols) - prontas)
+        for c in cols:
+            if c not in self.norm_cache:
+                self.norm_cache[c] = self._processar_coluna("norm", c, self.normalizar_texto)
+            if need_stem and c not in self.stem_cache:
+                self.stem_cache[c] = self._processar_coluna("stem", c, self.stem_pt)
+            if need_index:
+                if need_stem:
+                    if c not in self.indice_stem:
+                        with diagnostico.medir("indice_invertido", linhas=len(self.stem_cache[c])):
+                            self.indice_stem.adicionar_coluna(c, self.stem_cache[c], self._controle)
+                elif c not in self.indice_norm:
+                    with diagnostico.medir("indice_invertido", linhas=len(self.norm_cache[c])):
+                        self.indice_norm.adicionar_coluna(c, self.norm_cache[c], self._controle)
+
+    def _chave_processada(self, tipo: str, c: str) -> str | None:
+        if self.cache is None or self.planilha.chave is None:
+            return None
+        return f"v{VERSAO_CACHE}|{self.planilha.chave}|{tipo}|{c!r}"
+
+    def _processada_em_disco(self, tipo: str, c: str) -> pd.Series | None:
+        chave = self._chave_processada(tipo, c)
+        return self.cache.obter(chave) if chave is not None else None
+
+    def _guardar_processada(self, tipo: str, c: str, serie: pd.Series):
+        chave = self._chave_processada(tipo, c)
+        if chave is not None:
+            self.cache.guardar(chave, serie)
+
+    def _processar_coluna(self, tipo: str, c: str, funcao) -> pd.Series:
+        serie = self._processada_em_disco(tipo, c)
+        if serie is not None:
+            return serie
+        # Cada valor distinto é processado uma vez só e depois espalhado pelas linhas.
+        bruta = self.planilha.carregar([c])[c].astype(str)
+        inicio_fase = time.perf_counter()
+        memo = self._radical.cache_info() if tipo == "stem" and self._radical is not None else None
+        codigos, distintos = pd.factorize(bruta.to_numpy())
+        processados = []
+        for inicio in range(0, len(distintos), BLOCO_VERIFICACAO):
+            self._verificar()
+            processados.extend(funcao(v) for v in distintos[inicio:inicio + BLOCO_VERIFICACAO])
+        processados = np.array(processados + [""], dtype=object)
+        serie = pd.Series(processados[codigos], index=bruta.index, name=c)
+        diagnostico.registrar("normalizar" if tipo == "norm" else "radicais", time.perf_counter() - inicio_fase,
+                              len(distintos), len(bruta))
+        if tipo == "stem":
+            depois = self._radical.cache_info()
+            diagnostico.cache("memo_radicais", depois.hits - (memo.hits if memo else 0),
+                              depois.misses - (memo.misses if memo else 0))
+        self._guardar_processada(tipo, c, serie)
+        return serie
+
+    def _fatorar(self, c: str) -> tuple[np.ndarray, np.ndarray]:
+        # Códigos por linha e valores distintos da coluna normalizada.
+        if c not in self.distintos:
+            self.distintos[c] = pd.factorize(self.norm_cache[c].to_numpy())
+        return self.distintos[c]
+
+    def _ocorrencias(self, indice: IndiceInvertido, c: str, cand: list[np.ndarray | None],
+                     automato: AutomatoPalavras) -> list[np.ndarray]:
+        # Para cada palavra, a posição da primeira ocorrência em cada valor distinto da coluna (-1 se ausente).
+        # Só os candidatos do índice são varridos, uma vez cada, pelo autômato com todas as palavras.
+        _, valores = indice.colunas[c]
+        posicoes = [np.full(len(valores), -1, dtype=np.int64) for _ in cand]
+        if any(ids is None for ids in cand):
+            ids = range(len(valores))
+        else:
+            ids = np.unique(np.concatenate(cand)) if cand else []
+        with diagnostico.medir("varredura", chamadas=len(ids)):
+            for n, u in enumerate(ids):
+                if n % BLOCO_VERIFICACAO == 0:
+                    self._verificar()
+                    self._avancar_coluna(n / len(ids))
+                for k, pos in automato.varrer(valores[u]).items():
+                    posicoes[k][u] = pos
+        return posicoes
+
+    def _similares(self, c: str, alvos: list[str], limiar: float) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Para cada palavra, os ids dos valores distintos da coluna com partial_ratio >= limiar e as notas.
+        _, valores = self._fatorar(c)
+        resultado = [(np.empty(0, dtype=np.int64), np.empty(0))] * len(alvos)
+        sem_poda = []
+        for k, alvo in enumerate(alvos):
+            if minimo_qgramas_comuns(len(alvo), limiar) <= 0:
+                sem_poda.append(k)
+                continue
+            if c not in self.indice_qgramas:
+                with diagnostico.medir("indice_qgramas", linhas=len(valores)):
+                    self.indice_qgramas[c] = IndiceQGramas(valores, controle=self._controle)
+            with diagnostico.medir("candidatos"):
+                cand = self.indice_qgramas[c].candidatos(alvo, limiar)
+            # Cada palavra vale a mesma fração da coluna; as sem poda ficam com o fim dela.
+            feitas = k - len(sem_poda)
+            self._etapa = (feitas / len(alvos), (feitas + 1) / len(alvos))
+            notas = self._pontuar([alvo], valores[cand], limiar)[0]
+            aceitos = notas >= limiar
+            resultado[k] = (cand[aceitos], notas[aceitos])
+        if sem_poda:
+            self._etapa = (1 - len(sem_poda) / len(alvos), 1.0)
+            notas = self._pontuar([alvos[k] for k in sem_poda], valores, limiar)
+            for linha, k in enumerate(sem_poda):
+                ids = np.flatnonzero(notas[linha] >= limiar)
+                resultado[k] = (ids, notas[linha][ids])
+        return resultado
+
+    def _pontuar(self, alvos: list[str], valores: np.ndarray, limiar: float) -> np.ndarray:
+        # partial_ratio de cada palavra com cada valor; conta uma chamada por comparação.
+        with diagnostico.medir("similaridade", chamadas=len(alvos) * len(valores), linhas=len(valores)):
+            return self._pontuar_blocos(alvos, valores, limiar)
+
+    def _pontuar_blocos(self, alvos: list[str], valores: np.ndarray, limiar: float) -> np.ndarray:
+        # pontuar_similaridade em blocos de valores, conferindo o cancelamento e informando o avanço
+        # entre eles; o bloco encolhe com o número de palavras, para que cada um leve o mesmo tempo.
+        passo = max(BLOCO_VERIFICACAO * 10 // max(len(alvos), 1), 1)
+        if len(valores) <= passo:
+            self._verificar()
+            notas = pontuar_similaridade(alvos, valores, limiar, self.threads_rapidfuzz)
+            self._avancar_coluna(1.0)
+            return notas
+        blocos = []
+        for inicio in range(0, len(valores), passo):
+            self._verificar()
+            blocos.append(pontuar_similaridade(alvos, valores[inicio:inicio + passo], limiar, self.threads_rapidfuzz))
+            self._avancar_coluna(min(inicio + passo, len(valores)) / len(valores))
+        return np.concatenate(blocos, axis=1)
+
+    def _clear_caches(self):
+        self.norm_cache.clear()
+        self.stem_cache.clear()
+        self.distintos.clear()
+        self.indice_qgramas.clear()
+        self.indice_norm = IndiceInvertido()
+        self.indice_stem = IndiceInvertido()
+
+
+def _montar_partes(ci: int, achados: list[tuple], modo: str, limiar: int) -> list[tuple]:
+    # Pedaços (palavra, indice, coluna, posicao, nota) de arrays, um por palavra com ocorrências;
+    # palavras ainda sem resultado (None) ficam de fora.
+    partes = []
+    for k, achado in enumerate(achados):
+        if achado is None:
+            continue
+        indice, posicao, nota = achado
+        if nota is not None and modo == "similaridade":
+            sel = nota >= limiar
+            indice, nota = indice[sel], nota[sel]
+        n = len(indice)
+        if n:
+            partes.append((np.full(n, k), indice, np.full(n, ci),
+                           posicao if posicao is not None else np.full(n, -1),
+                           nota if nota is not None else np.full(n, 100.0)))
+    return partes
+
+
+# ===================== Processos de busca =====================
+_motor_trabalhador: MotorBusca | None = None
+
+
+def _iniciar_trabalhador():
+    global _motor_trabalhador
+    logging.getLogger().setLevel(logging.WARNING)
+    _motor_trabalhador = MotorBusca(processos=1)
+    # Cada processo já ocupa um núcleo; o rapidfuzz não deve abrir threads extras.
+    _motor_trabalhador.threads_rapidfuzz = 1
+
+
+def _buscar_fragmento(fragmento: pd.Series, palavras: list[str], modo: str, limiar: int) -> tuple:
+    # Roda num processo do pool: busca serial num pedaço de uma coluna (o índice preserva as linhas).
+    # Devolve também o fragmento normalizado (e reduzido a radicais, no modo radical).
+    if _motor_trabalhador is None:
+        _iniciar_trabalhador()
+    _motor_trabalhador.definir_planilha(fragmento.to_frame())
+    diagnostico.limpar()
+    try:
+        resultado = _motor_trabalhador.buscar_palavras_chave(palavras, modo=modo, limiar=limiar)
+        processadas = (_motor_trabalhador.norm_cache.get(fragmento.name),
+                       _motor_trabalhador.stem_cache.get(fragmento.name))
+    finally:
+        _motor_trabalhador.definir_planilha(None)
+    fases, caches = diagnostico.instantaneo()
+    fases.pop("busca", None)  # o processo principal mede a busca inteira
+    return (resultado.palavra, resultado.indice, resultado.posicao, resultado.nota, resultado.avisos, processadas,
+            (fases, caches))
+
+
+# ===================== Leitura/Exportação =====================
+def abrir_excel(caminho: str) -> pd.ExcelFile:
+    _dimensao_sem_varredura()
+    return pd.ExcelFile(caminho, engine="openpyxl")
+
+
+@lru_cache(maxsize=None)
+def _dimensao_sem_varredura():
+    # Ao abrir um arquivo em modo read-only, o openpyxl procura a <dimension> de cada aba ouvindo só
+    # o fim dos elementos; quando ela falta (arquivos write-only, como as exportações deste programa),
+    # só para no fim de <sheetData>, depois de percorrer a aba inteira. Aqui a procura ouve o início
+    # dos elementos e para onde os dados começam.
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+    from openpyxl.worksheet._reader import DATA_TAG, DIMENSION_TAG
+    from openpyxl.worksheet.dimensions import SheetDimension
+    from openpyxl.xml.functions import iterparse
+
+    def _get_size(self):
+        with self._get_source() as src:
+            for _evento, elemento in iterparse(src, events=("start",)):
+                if elemento.tag == DIMENSION_TAG:
+                    dimensao = SheetDimension.from_tree(elemento).boundaries
+                    if dimensao is not None:
+                        self._min_column, self._min_row, self._max_column, self._max_row = dimensao
+                    return
+                if elemento.tag == DATA_TAG:
+                    return
+
+    ReadOnlyWorksheet._get_size = _get_size
+
+
+def ler_blocos(caminho: str, aba: str | None = None, tamanho_bloco: int = 50_000,
+               encoding: str = "utf-8-sig") -> Iterator[pd.DataFrame]:
+    """Lê um .xlsx (openpyxl read-only) ou .csv em blocos de ``tamanho_bloco`` linhas.
+
+    Os valores são mantidos como estão nas células, sem a inferência de tipos do pandas, para que
+    o resultado da busca não dependa de onde caem os limites dos blocos. O índice de cada bloco
+    continua a numeração das linhas da planilha inteira.
+    """
+    if caminho.lower().endswith(".csv"):
+        yield from _ler_blocos_csv(caminho, tamanho_bloco, encoding)
+    else:
+        yield from _ler_blocos_excel(caminho, aba, tamanho_bloco)
+
+
+def ler_cabecalho(caminho: str, aba: str | None = None, encoding: str = "utf-8-sig") -> list:
+    if caminho.lower().endswith(".csv"):
+        return pd.read_csv(caminho, sep=_separador_csv(caminho, encoding), encoding=encoding, nrows=0).columns.tolist()
+    excel = abrir_excel(caminho)
+    try:
+        ws = excel.book[aba if aba is not None else excel.sheet_names[0]]
+        _, largura = _dimensao_aba(ws)
+        cabecalho = _cabecalho_excel(ws)
+        return _nomes_colunas(cabecalho, max(len(cabecalho), largura))
+    finally:
+        excel.close()
+
+
+def _ler_blocos_excel(caminho: str, aba: str | None, tamanho_bloco: int) -> Iterator[pd.DataFrame]:
+    # A largura vem da dimensão declarada (ou do cabeçalho); linhas mais largas que ela
+    # acrescentam colunas "Unnamed: n" a partir do bloco em que aparecem.
+    excel = abrir_excel(caminho)
+    try:
+        ws = excel.book[aba if aba is not None else excel.sheet_names[0]]
+        # Sem dimensão declarada a aba não é medida antes: as colunas crescem durante a leitura.
+        _, largura = _dimensao_aba(ws, medir=False)
+        cabecalho = _cabecalho_excel(ws)
+        colunas = _nomes_colunas(cabecalho, max(len(cabecalho), largura))
+
+        linhas: list[list] = []
+        vazias: list[list] = []
+        inicio = 0
+        marca = time.perf_counter()
+        for n, row in enumerate(ws.rows):
+            if n == 0:
+                continue
+            tamanho = _largura_linha(row)
+            if tamanho > len(colunas):
+                colunas = _nomes_colunas(cabecalho, tamanho)
+                for valores in linhas + vazias:
+                    valores.extend([np.nan] * (tamanho - len(valores)))
+            valores = [_converter_celula(row[p]) if p < len(row) else "" for p in range(len(colunas))]
+            valores = [np.nan if v == "" else v for v in valores]
+            # Linhas vazias só entram quando aparece outra com dados depois (o read_excel descarta as finais).
+            if not tamanho:
+                vazias.append(valores)
+                continue
+            linhas.extend(vazias)
+            vazias.clear()
+            linhas.append(valores)
+            if len(linhas) >= tamanho_bloco:
+                bloco = pd.DataFrame(linhas, columns=colunas, dtype=object,
+                                     index=pd.RangeIndex(inicio, inicio + len(linhas)))
+                diagnostico.registrar("ler_planilha", time.perf_counter() - marca, linhas=len(bloco))
+                yield bloco
+                marca = time.perf_counter()
+                inicio += len(linhas)
+                linhas = []
+        if linhas:
+            diagnostico.registrar("ler_planilha", time.perf_counter() - marca, linhas=len(linhas))
+            yield pd.DataFrame(linhas, columns=colunas, dtype=object, index=pd.RangeIndex(inicio, inicio + len(linhas)))
+    finally:
+        excel.close()
+
+
+def _separador_csv(caminho: str, encoding: str) -> str:
+    with open(caminho, encoding=encoding, newline="") as f:
+        amostra = f.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _ler_blocos_csv(caminho: str, tamanho_bloco: int, encoding: str) -> Iterator[pd.DataFrame]:
+    sep = _separador_csv(caminho, encoding)
+    with pd.read_csv(caminho, sep=sep, dtype=str, encoding=encoding, chunksize=tamanho_bloco) as leitor:
+        yield from leitor
+
+
+def _registro(palavra: str, item: dict, linha_completa: dict, extras: Dict | None = None) -> dict:
+    base = dict(extras or {})
+    base.update({
+        'PALAVRA_BUSCADA': palavra,
+        'LINHA_ENCONTRADA': item['linha'],
+        'COLUNA_ENCONTRADA': item['coluna'],
+        'CONTEUDO_ENCONTRADO': item['valor_original']
+    })
+    for nome_coluna, valor in linha_completa.items():
+        base[f'ORIGINAL_{nome_coluna}'] = valor
+    return base
+
+
+def registros_em_blocos(resultado: ResultadoBusca, extras: Dict | None = None,
+                       tamanho_bloco: int = 10_000) -> Iterator[dict]:
+    """Um registro por ocorrência, na ordem do resultado.
+
+    As linhas completas são lidas por blocos de ocorrências, para que a memória usada não cresça
+    com o tamanho do resultado.
+    """
+    if not len(resultado):
+        return
+    completa = resultado.planilha.carregar()
+    for inicio in range(0, len(resultado), tamanho_bloco):
+        parte = resultado.selecionar(slice(inicio, inicio + tamanho_bloco))
+        with diagnostico.medir("materializar", linhas=len(parte)):
+            linhas = completa.loc[np.unique(parte.indice)].to_dict("index")
+        for item in parte.ocorrencias():
+            yield _registro(item['palavra'], item, linhas[item['indice']], extras)
+
+
+def registros_agrupados(resultado: ResultadoBusca, extras: Dict | None = None,
+                        tamanho_bloco: int = 10_000) -> Iterator[dict]:
+    """Um registro por linha encontrada, com a lista das ocorrências dela em vez de repetir a linha."""
+    if not len(resultado):
+        return
+    completa = resultado.planilha.carregar()
+    por_linha = resultado.selecionar(np.lexsort((resultado.coluna, resultado.palavra, resultado.indice)))
+    unicos, inicios = np.unique(por_linha.indice, return_index=True)
+    fins = np.append(inicios[1:], len(por_linha))
+    for b in range(0, len(unicos), tamanho_bloco):
+        with diagnostico.medir("materializar", linhas=len(unicos[b:b + tamanho_bloco])):
+            linhas = completa.loc[unicos[b:b + tamanho_bloco]].to_dict("index")
+        for i, ini, fim in zip(unicos[b:b + tamanho_bloco], inicios[b:b + tamanho_bloco], fins[b:b + tamanho_bloco]):
+            palavras = [resultado.palavras[k] for k in por_linha.palavra[ini:fim]]
+            colunas = [resultado.colunas[ci] for ci in por_linha.coluna[ini:fim]]
+            registro = dict(extras or {})
+            registro.update({
+                'LINHA_ENCONTRADA': int(i) + 2,
+                'PALAVRAS_ENCONTRADAS': ", ".join(dict.fromkeys(palavras)),
+                'OCORRENCIAS': "; ".join(f"{p} → {c}" for p, c in zip(palavras, colunas)),
+            })
+            for nome_coluna, valor in linhas[i].items():
+                registro[f'ORIGINAL_{nome_coluna}'] = valor
+            yield registro
+
+
+def registros_em_fluxo(ocorrencias: Iterable[dict], extras: Dict | None = None) -> Iterator[dict]:
+    for item in ocorrencias:
+        yield _registro(item['palavra'], item, item['linha_completa'], extras)
+
+
+def colunas_registros(colunas_planilha: Iterable, extras: Iterable[str] = (), agrupado: bool = False) -> list[str]:
+    """Cabeçalho da exportação: extras, colunas da ocorrência e as ``ORIGINAL_*`` em ordem alfabética."""
+    if agrupado:
+        fixas = ['LINHA_ENCONTRADA', 'PALAVRAS_ENCONTRADAS', 'OCORRENCIAS']
+    else:
+        fixas = ['PALAVRA_BUSCADA', 'LINHA_ENCONTRADA', 'COLUNA_ENCONTRADA', 'CONTEUDO_ENCONTRADO']
+    originais = sorted(dict.fromkeys(f'ORIGINAL_{c}' for c in colunas_planilha))
+    return list(extras) + fixas + originais
+
+
+def _ausente(valor) -> bool:
+    return valor is None or valor is pd.NaT or (isinstance(valor, float) and valor != valor)
+
+
+def parquet_disponivel() -> bool:
+    """``pyarrow`` instalado (sem importá-lo: o pacote é pesado e só a gravação em .parquet o usa)."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class EscritorRegistros:
+    """Grava registros conforme chegam, sem juntá-los em memória.
+
+    O formato sai da extensão de ``saida``: ``.csv``, ``.parquet`` (requer ``pyarrow``; valores
+    gravados como texto) ou, nos demais casos, ``.xlsx`` no modo write-only do openpyxl, que passa
+    para uma nova aba ao atingir o limite de linhas do Excel.
+    """
+
+    LIMITE_LINHAS_XLSX = 1_048_576
+
+    def __init__(self, saida: str, colunas: list[str], tamanho_lote: int = 10_000):
+        self.saida = saida
+        self.colunas = list(colunas)
+        self.tamanho_lote = tamanho_lote
+        self.total = 0
+        self.formato = self.formato_de(saida)
+        getattr(self, f"_abrir_{self.formato}")()
+
+    @staticmethod
+    def formato_de(saida: str) -> str:
+        """Formato em que ``saida`` seria gravada; levanta ``RuntimeError`` se faltar o pacote do formato.
+
+        Serve para conferir a saída antes de começar uma busca longa.
+        """
+        extensao = os.path.splitext(saida)[1].lower()
+        formato = extensao[1:] if extensao in (".csv", ".parquet") else "xlsx"
+        if formato == "parquet" and not parquet_disponivel():
+            raise RuntimeError("Para gravar .parquet instale o pacote 'pyarrow'.")
+        return formato
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def escrever(self, registros: Iterable[dict]) -> int:
+        """Grava os registros; retorna quantos foram gravados nesta chamada."""
+        gravar = getattr(self, f"_escrever_{self.formato}")
+        inicio = time.perf_counter()
+        antes = self.total
+        lote = []
+        for registro in registros:
+            valores = (registro.get(c) for c in self.colunas)
+            lote.append([None if _ausente(v) else v for v in valores])
+            if len(lote) >= self.tamanho_lote:
+                gravar(lote)
+                self.total += len(lote)
+                lote = []
+        if lote:
+            gravar(lote)
+            self.total += len(lote)
+        diagnostico.registrar("exportar", time.perf_counter() - inicio, linhas=self.total - antes)
+        return self.total - antes
+
+    def fechar(self):
+        getattr(self, f"_fechar_{self.formato}")()
+
+    # ---- CSV ----
+    def _abrir_csv(self):
+        self._arquivo = open(self.saida, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._arquivo, lineterminator="\n")
+        self._csv.writerow(self.colunas)
+
+    def _escrever_csv(self, lote: list[list]):
+        self._csv.writerows(["" if v is None else v for v in linha] for linha in lote)
+
+    def _fechar_csv(self):
+        self._arquivo.close()
+
+    # ---- XLSX (openpyxl write-only) ----
+    def _abrir_xlsx(self):
+        from openpyxl import Workbook
+
+        self._livro = Workbook(write_only=True)
+        self._abas = 0
+        self._nova_aba()
+
+    def _nova_aba(self):
+        self._abas += 1
+        self._aba = self._livro.create_sheet(f"Sheet{self._abas}")
+        self._aba.append(self.colunas)
+        self._linhas_aba = 1
+
+    def _escrever_xlsx(self, lote: list[list]):
+        for linha in lote:
+            if self._linhas_aba >= self.LIMITE_LINHAS_XLSX:
+                self._nova_aba()
+            self._aba.append(linha)
+            self._linhas_aba += 1
+
+    def _fechar_xlsx(self):
+        self._livro.save(self.saida)
+
+    # ---- Parquet ----
+    def _abrir_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._esquema = pa.schema([(c, pa.string()) for c in self.colunas])
+        self._parquet = pq.ParquetWriter(self.saida, self._esquema)
+
+    def _escrever_parquet(self, lote: list[list]):
+        colunas = [self._pa.array([None if v is None else str(v) for v in coluna], self._pa.string())
+                   for coluna in zip(*lote)]
+        self._parquet.write_table(self._pa.Table.from_arrays(colunas, schema=self._esquema))
+
+    def _fechar_parquet(self):
+        self._parquet.close()
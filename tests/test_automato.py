@@ -0,0 +1,30 @@
+"""AutomatoPalavras contra a busca ingênua (str.find) de cada palavra."""
+import random
+
+import pytest
+
+from motor_busca import AutomatoPalavras
+
+
+def _textos(semente: int, quantidade: int = 2000) -> list[str]:
+    rnd = random.Random(semente)
+    return ["".join(rnd.choice("aab c-ç") for _ in range(rnd.randint(0, 25))) for _ in range(quantidade)]
+
+
+@pytest.mark.parametrize("palavras", [
+    ["a"],
+    ["ab", "a", "aab", "b"],
+    ["aa", "aaa", "aaaa"],
+    ["c-", "-ç", " c", "ab c"],
+    ["ab", "ab", "", "ba"],
+    ["ç", "çç", "bç", "xyz"],
+])
+def test_primeira_ocorrencia_igual_a_find(palavras):
+    automato = AutomatoPalavras(palavras)
+    for texto in _textos(len(palavras)):
+        esperado = {k: texto.find(p) for k, p in enumerate(palavras) if p in texto}
+        assert automato.varrer(texto) == esperado, texto
+
+
+def test_sem_palavras():
+    assert AutomatoPalavras([]).varrer("abc") == {}
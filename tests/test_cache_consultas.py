@@ -0,0 +1,70 @@
+"""CacheConsultas: refiltragem ao subir o limiar, recálculo ao descer e descarte LRU."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_busca import CacheConsultas, MotorBusca, Planilha
+
+PALAVRAS = ["arquivamento", "decisão", "recurso"]
+VALORES = {
+    "assunto": ["Arquivamento do feito", "arquivamnto", "DECISAO final", "decisoes", "recursal", "", None, "recurso"],
+    "obs": ["arquivar", "decidir", "rec.", "arquivamento parcial", "x", "recursos", "decisão", "arq"],
+}
+
+
+def _chaves(resultado) -> list[tuple]:
+    return sorted(zip(resultado.palavra.tolist(), resultado.indice.tolist(), resultado.coluna.tolist(),
+                      np.round(resultado.nota, 3).tolist()))
+
+
+def _buscar_sem_cache(limiar: int):
+    motor = MotorBusca(processos=1)
+    motor.definir_planilha(Planilha(pd.DataFrame(VALORES), chave="teste"))
+    return motor.buscar_palavras_chave(PALAVRAS, modo="similaridade", limiar=limiar)
+
+
+def test_limiar_maior_refiltra_e_menor_recalcula(monkeypatch):
+    motor = MotorBusca(processos=1)
+    motor.definir_planilha(Planilha(pd.DataFrame(VALORES), chave="teste"))
+    calculos = []
+    original = motor._similares
+    monkeypatch.setattr(motor, "_similares",
+                        lambda c, alvos, limiar: calculos.append(limiar) or original(c, alvos, limiar))
+
+    # (limiar, se as notas precisam ser calculadas de novo)
+    for limiar, calcula in ((70, True), (85, False), (100, False), (60, True), (85, False), (60, False)):
+        calculos.clear()
+        resultado = motor.buscar_palavras_chave(PALAVRAS, modo="similaridade", limiar=limiar)
+        assert bool(calculos) == calcula, limiar
+        assert _chaves(resultado) == _chaves(_buscar_sem_cache(limiar)), limiar
+
+
+def test_palavra_nova_nao_recalcula_as_guardadas(monkeypatch):
+    motor = MotorBusca(processos=1)
+    motor.definir_planilha(Planilha(pd.DataFrame(VALORES), chave="teste"))
+    motor.buscar_palavras_chave(PALAVRAS[:2], modo="similaridade", limiar=80)
+    alvos_calculados = []
+    original = motor._similares
+    monkeypatch.setattr(motor, "_similares",
+                        lambda c, alvos, limiar: alvos_calculados.extend(alvos) or original(c, alvos, limiar))
+    resultado = motor.buscar_palavras_chave(PALAVRAS, modo="similaridade", limiar=80)
+    assert set(alvos_calculados) == {"recurso"}
+    assert _chaves(resultado) == _chaves(_buscar_sem_cache(80))
+
+
+@pytest.mark.parametrize("limiar_guardado, limiar_pedido, serve", [(70, 70, True), (70, 90, True), (70, 60, False)])
+def test_obter_respeita_o_limiar_guardado(limiar_guardado, limiar_pedido, serve):
+    cache = CacheConsultas()
+    cache.guardar(("p", "c", "similaridade", "a"), limiar_guardado, np.arange(3), None, np.full(3, 90.0))
+    assert (cache.obter(("p", "c", "similaridade", "a"), limiar_pedido) is not None) == serve
+
+
+def test_descarta_as_menos_usadas_acima_do_limite_de_linhas():
+    cache = CacheConsultas(limite_linhas=25)
+    for chave in "abc":
+        cache.guardar(chave, 0, np.arange(7), None, None)  # 8 linhas cada, contando a própria entrada
+    assert cache.obter("a") is not None
+    cache.guardar("d", 0, np.arange(7), None, None)
+    assert cache.obter("b") is None
+    assert all(cache.obter(c) is not None for c in "acd")
+    assert len(cache) == 3
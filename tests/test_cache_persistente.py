@@ -0,0 +1,76 @@
+"""Descarte do CachePersistente: LRU pelo limite, hashes de arquivos sem entradas e órfãos de outro processo."""
+import os
+import time
+
+from cache_persistente import CachePersistente
+
+DADOS = b"x" * 1000
+
+
+def _cache(tmp_path, limite=3500) -> CachePersistente:
+    # Cada entrada serializada ocupa pouco mais de 1000 bytes: o limite padrão comporta três.
+    return CachePersistente(str(tmp_path / "cache"), limite)
+
+
+def _pkls(cache) -> set[str]:
+    return {n for n in os.listdir(cache.diretorio) if n.endswith(".pkl")}
+
+
+def test_descarta_os_menos_usados_acima_do_limite(tmp_path):
+    cache = _cache(tmp_path)
+    for chave in "abc":
+        cache.guardar(chave, DADOS)
+        time.sleep(0.01)
+    assert cache.obter("a") == DADOS  # "a" passa a ser a mais recente
+    time.sleep(0.01)
+    cache.guardar("d", DADOS)
+
+    assert cache.obter("b") is None
+    assert {c: cache.obter(c) for c in "acd"} == dict.fromkeys("acd", DADOS)
+    assert cache.tamanho_total() <= cache.limite_bytes
+    assert len(_pkls(cache)) == 3
+
+
+def test_entrada_maior_que_o_limite_nao_e_guardada(tmp_path):
+    cache = _cache(tmp_path, limite=500)
+    cache.guardar("a", DADOS)
+    assert cache.obter("a") is None
+    assert not _pkls(cache)
+
+
+def test_hash_sai_do_indice_com_a_ultima_entrada_do_arquivo(tmp_path):
+    planilha = tmp_path / "p.xlsx"
+    planilha.write_bytes(b"conteudo")
+    cache = _cache(tmp_path)
+    cache.guardar(cache.chave_planilha(str(planilha), "A"), DADOS)
+    assert str(planilha) in cache._indice["arquivos"]
+
+    for chave in "bcd":
+        time.sleep(0.01)
+        cache.guardar(chave, DADOS)
+    assert str(planilha) not in cache._indice["arquivos"]
+
+
+def test_orfaos_de_outro_processo_contam_e_saem_primeiro(tmp_path):
+    # Dois processos na mesma pasta: o segundo regrava o indice.json sem as entradas do primeiro.
+    primeiro = _cache(tmp_path)
+    segundo = _cache(tmp_path)
+    primeiro.guardar("a", DADOS)
+    primeiro.guardar("b", DADOS)
+    segundo.guardar("c", DADOS)
+    assert len(_pkls(segundo)) == 3
+
+    segundo.guardar("d", DADOS)
+    assert _pkls(segundo) == {os.path.basename(segundo._arquivo_entrada(c)) for c in "cd"}
+    assert segundo.obter("c") == DADOS
+    assert CachePersistente(segundo.diretorio, segundo.limite_bytes).tamanho_total() == segundo.tamanho_total()
+
+
+def test_limpar_remove_tambem_os_orfaos(tmp_path):
+    primeiro = _cache(tmp_path)
+    segundo = _cache(tmp_path)
+    primeiro.guardar("a", DADOS)
+    segundo.guardar("b", DADOS)
+    segundo.limpar()
+    assert not _pkls(segundo)
+    assert segundo.tamanho_total() == 0
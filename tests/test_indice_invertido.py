@@ -0,0 +1,57 @@
+"""IndiceInvertido e a busca exata mantêm a semântica de substring do str.contains."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import motor_busca
+from motor_busca import IndiceInvertido, MotorBusca, Planilha
+
+ALVOS = ["ab", "ab ba", " ba", "ba ", "a-c", "c, ab", "ção", "b", "ab ab", "xyz", "a c"]
+
+
+def _valores(semente: int, quantidade: int = 3000) -> list[str]:
+    rnd = random.Random(semente)
+    palavras = ["ab", "ba", "abba", "c", "ção", "acao", "a-c", "bab"]
+    return [rnd.choice(["", " ", "-", ", "]).join(rnd.choice(palavras) for _ in range(rnd.randint(0, 6)))
+            for _ in range(quantidade)]
+
+
+@pytest.fixture(scope="module")
+def valores():
+    return _valores(1)
+
+
+def test_candidatos_contem_todos_os_valores_com_o_trecho(valores):
+    indice = IndiceInvertido()
+    indice.adicionar_coluna("x", pd.Series(valores))
+    _, distintos = indice.colunas["x"]
+    candidatos = indice.candidatos(ALVOS, ["x"])["x"]
+    for alvo, ids in zip(ALVOS, candidatos):
+        esperados = {i for i, v in enumerate(distintos) if alvo in v}
+        assert ids is None or esperados <= set(ids.tolist()), alvo
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_busca_exata_igual_a_str_contains(valores, processos, monkeypatch):
+    # Limites baixos para que, com 2 processos, a busca seja dividida em fragmentos.
+    monkeypatch.setattr(motor_busca, "MIN_CELULAS_PARALELO", 1000)
+    monkeypatch.setattr(motor_busca, "MIN_LINHAS_FRAGMENTO", 500)
+    df = pd.DataFrame({"x": valores, "y": _valores(2)})
+    motor = MotorBusca(processos=processos)
+    try:
+        motor.definir_planilha(Planilha(df))
+        resultado = motor.buscar_palavras_chave(ALVOS, modo="exato")
+    finally:
+        motor.encerrar()
+
+    # A busca compara textos normalizados (sem acentos, em minúsculas), dos dois lados.
+    normalizado = df.apply(lambda coluna: coluna.map(motor.normalizar_texto))
+    for k, alvo in enumerate(map(motor.normalizar_texto, ALVOS)):
+        for j, c in enumerate(df.columns):
+            selecao = (resultado.palavra == k) & (resultado.coluna == j)
+            esperado = df.index[normalizado[c].str.contains(alvo, regex=False)]
+            assert np.array_equal(np.sort(resultado.indice[selecao]), esperado), (alvo, c)
+            posicoes = [normalizado.at[i, c].find(alvo) for i in resultado.indice[selecao]]
+            assert resultado.posicao[selecao].tolist() == posicoes, (alvo, c)
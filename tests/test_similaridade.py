@@ -0,0 +1,61 @@
+"""Poda por q-gramas e busca por similaridade contra o partial_ratio aplicado a todos os valores."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+from motor_busca import IndiceQGramas, MotorBusca, Planilha, minimo_qgramas_comuns
+
+ALVOS = ["abcd", "arquivamento", "acao", "decisao", "ab", "bacab", "xyzw"]
+
+
+def _valores(semente: int, quantidade: int = 2000) -> np.ndarray:
+    rnd = random.Random(semente)
+    base = ["arquivamento", "arquivar", "acao", "decisao", "abcd", "bacab"]
+    valores = []
+    for _ in range(quantidade):
+        texto = rnd.choice(base) if rnd.random() < 0.5 else ""
+        # Trocas, remoções e inserções aleatórias, para haver notas perto de qualquer limiar.
+        texto = list(texto)
+        for _ in range(rnd.randint(0, 4)):
+            if texto and rnd.random() < 0.6:
+                texto[rnd.randrange(len(texto))] = rnd.choice("abcdeiou ")
+            else:
+                texto.insert(rnd.randint(0, len(texto)), rnd.choice("abcdeiou "))
+        prefixo = "".join(rnd.choice("abc ") for _ in range(rnd.randint(0, 8)))
+        valores.append(prefixo + "".join(texto))
+    return np.array(valores, dtype=object)
+
+
+@pytest.fixture(scope="module")
+def valores():
+    return _valores(3)
+
+
+@pytest.mark.parametrize("limiar", [60, 70, 75, 80, 85, 90, 95, 100])
+def test_candidatos_nao_perdem_valores_acima_do_limiar(valores, limiar):
+    indice = IndiceQGramas(valores)
+    for alvo in ALVOS:
+        candidatos = indice.candidatos(alvo, limiar)
+        if candidatos is None:
+            assert minimo_qgramas_comuns(len(alvo), limiar) <= 0
+            continue
+        acima = {i for i, v in enumerate(valores) if fuzz.partial_ratio(alvo, v) >= limiar}
+        assert acima <= set(candidatos.tolist()), (alvo, limiar)
+
+
+def test_busca_por_similaridade_igual_a_forca_bruta(valores):
+    df = pd.DataFrame({"x": valores})
+    motor = MotorBusca(processos=1)
+    motor.definir_planilha(Planilha(df, chave="teste"))
+    # Limiares em sequência: subir reaproveita as notas guardadas, descer abaixo delas refaz a conta.
+    for limiar in (80, 90, 70, 80):
+        resultado = motor.buscar_palavras_chave(ALVOS, modo="similaridade", limiar=limiar)
+        for k, alvo in enumerate(ALVOS):
+            notas = np.array([fuzz.partial_ratio(alvo, v) for v in valores])
+            selecao = resultado.palavra == k
+            esperado = np.flatnonzero(notas >= limiar)
+            assert np.array_equal(np.sort(resultado.indice[selecao]), esperado), (alvo, limiar)
+            np.testing.assert_allclose(resultado.nota[selecao], notas[resultado.indice[selecao]], rtol=1e-5)